@@ -1,5 +1,11 @@
-from .slicer_utils import slice_and_extract
-from .waveform_utils import create_bidirectional_waveforms, save_binary_waveform, allocation_size, stream_waveform
+from .slicer_utils import slice_and_extract, slice_and_extract_parallel, slice_sla, invalidate_slice_cache
+from .waveform_utils import create_bidirectional_waveforms, iter_bidirectional_waveforms, save_binary_waveform, WaveformWriter, open_waveform_file, allocation_size, plan_chunks, stream_waveform, build_multichannel_waveform, iter_multichannel_layers, play_multichannel_waveform, StreamTelemetry
+from .stack_utils import load_slice_stack_parallel, SL1Archive, PackedSliceStack, write_packed_stack
 from .slicer_finder import find_prusaslicer
-from .motion_utils import MotionController
-from .laser_utils import toggle_shutter, toggle_resonance_scanner
\ No newline at end of file
+from .motion_utils import StageController, HexapodController
+from .laser_utils import toggle_shutter, toggle_resonance_scanner, LaserController
+from .timing_utils import pixel_timing, apply_pixel_timing
+from .mesh_utils import decimate, preview_mesh
+from .toolpath_utils import load_dxf, simplify_contours, order_contours, estimate_toolpath, dxf_toolpath
+from .surface_utils import SurfaceMap
+from .burst_utils import BurstStreamer, format_burst_report
@@ -0,0 +1,28 @@
+import importlib
+import os
+
+# Hardware driver selection
+# Every module that talks to hardware gets its driver from load_driver, so the
+# in-process simulators in nanostride/sim can stand in for the real drivers
+# without code changes. NANOSTRIDE_SIM=1 (or "all") simulates everything;
+# a comma-separated list such as NANOSTRIDE_SIM=nifgen,pipython picks drivers.
+SIMULATORS = {
+    "nifgen": "nifgen",
+    "nidaqmx": "nidaqmx",
+    "SPiiPlusPython": "spiiplus",
+    "pipython": "pipython",
+}
+
+def simulated(driver):
+    selected = os.environ.get("NANOSTRIDE_SIM", "").strip()
+    if selected.lower() in ("1", "all", "true", "yes"):
+        return True
+    return driver in [name.strip() for name in selected.split(",")]
+
+def load_driver(driver):
+    if not simulated(driver):
+        return importlib.import_module(driver)
+    module = f"sim.{SIMULATORS[driver]}"
+    if __package__:
+        module = f"{__package__}.{module}"
+    return importlib.import_module(module)
@@ -0,0 +1,219 @@
+import time
+import numpy as np
+from collections import namedtuple
+try:
+    from .backends import load_driver
+except ImportError:
+    from backends import load_driver
+
+nidaqmx = load_driver("nidaqmx")
+
+# Triggered burst streaming
+# One burst of samples_per_burst samples goes out on every resonant-mirror line
+# trigger, each burst the next segment of the data. Instead of stopping,
+# rewriting and restarting a finite AO task per line, a retriggerable counter
+# turns every trigger into exactly samples_per_burst sample clock ticks, and a
+# continuous, non-regenerating AO task clocked by that counter walks through a
+# large buffer. Python only refills the buffer, block_bursts segments at a time.
+# A second counter, if given, counts trigger edges so missed lines show up.
+BurstReport = namedtuple("BurstReport", ["bursts_written", "bursts_generated", "triggers_seen", "missed_triggers",
+                                         "trigger_rate", "elapsed", "underflow", "stalled"])
+
+# DAQmx errors for generation running past the written data
+UNDERFLOW_ERRORS = (-200290, -200621, -200018)
+
+# Whole bursts from data: a (bursts, samples) array, a flat array or an
+# iterable of segments. Short segments are padded with zeros.
+def _burst_blocks(data, samples_per_burst, block_bursts):
+    if isinstance(data, np.ndarray):
+        bursts = data.reshape(-1, samples_per_burst) if data.ndim == 1 else data
+        for start in range(0, len(bursts), block_bursts):
+            yield np.ascontiguousarray(bursts[start:start + block_bursts], dtype=np.float64).reshape(-1)
+        return
+    block = []
+    for segment in data:
+        burst = np.zeros(samples_per_burst)
+        segment = np.asarray(segment, dtype=np.float64)[:samples_per_burst]
+        burst[:len(segment)] = segment
+        block.append(burst)
+        if len(block) == block_bursts:
+            yield np.concatenate(block)
+            block = []
+    if block:
+        yield np.concatenate(block)
+
+# line_rate is the expected trigger rate (Hz); it paces the refill loop and
+# rejects bursts too long to finish within one line. None skips the check.
+# tail_bursts off-level bursts follow the data, enough to cover the drain
+# loop's reaction time (64 lines is 8 ms at 7.9 kHz).
+class BurstStreamer:
+    def __init__(self, ao_channel="PXI1Slot6/ao1", counter="PXI1Slot6/ctr0", trigger_source="/PXI1Slot2/PFI0",
+                 trigger_edge=None, sample_rate=2e6, samples_per_burst=126, buffer_bursts=4096, block_bursts=512,
+                 edge_counter=None, line_rate=7910.0, off_level=0.0, tail_bursts=64):
+        if len(ao_channel.split("/")) != 2 or len(counter.split("/")) != 2:
+            raise ValueError("ao_channel and counter must look like 'PXI1Slot6/ao1' and 'PXI1Slot6/ctr0'.")
+        if block_bursts > buffer_bursts or tail_bursts > buffer_bursts:
+            raise ValueError("block_bursts and tail_bursts must not exceed buffer_bursts.")
+        if tail_bursts < 1:
+            raise ValueError("At least one off-level tail burst is needed to end in a defined state.")
+        self.ao_channel = ao_channel
+        self.counter = counter
+        self.trigger_source = trigger_source
+        self.trigger_edge = trigger_edge if trigger_edge is not None else nidaqmx.constants.Edge.FALLING
+        self.sample_rate = sample_rate
+        self.samples_per_burst = samples_per_burst
+        self.buffer_bursts = buffer_bursts
+        self.block_bursts = block_bursts
+        self.edge_counter = edge_counter
+        self.line_rate = line_rate
+        self.off_level = off_level
+        self.tail_bursts = tail_bursts
+        # A burst has to finish before the next line trigger, or that trigger is lost
+        if line_rate is not None and samples_per_burst / sample_rate >= 1 / line_rate:
+            raise ValueError(f"{samples_per_burst} samples at {sample_rate:g} S/s do not fit in one "
+                             f"{1e6 / line_rate:.1f} us line.")
+
+    def _clock_terminal(self):
+        device, counter = self.counter.split("/")
+        return f"/{device}/{counter.capitalize()}InternalOutput"
+
+    # Stream every burst in data, then tail_bursts bursts at off_level so the
+    # output ends in a defined state. Returns once the data has been generated;
+    # if idle_timeout seconds pass without a new burst going out (the line
+    # triggers stopped or never came) streaming is aborted and reported stalled.
+    def stream(self, data, idle_timeout=1.0, verbose=True):
+        n = self.samples_per_burst
+        buffer_samples = self.buffer_bursts * n
+        blocks = _burst_blocks(data, n, self.block_bursts)
+        tail = np.full(self.tail_bursts * n, self.off_level)
+
+        with nidaqmx.Task() as clock, nidaqmx.Task() as ao, nidaqmx.Task() as edges:
+            clock.co_channels.add_co_pulse_chan_freq(self.counter, freq=self.sample_rate, duty_cycle=0.5)
+            clock.timing.cfg_implicit_timing(sample_mode=nidaqmx.constants.AcquisitionType.FINITE,
+                                             samps_per_chan=n)
+            clock.triggers.start_trigger.cfg_dig_edge_start_trig(self.trigger_source, self.trigger_edge)
+            clock.triggers.start_trigger.retriggerable = True
+
+            ao.ao_channels.add_ao_voltage_chan(self.ao_channel)
+            ao.timing.cfg_samp_clk_timing(self.sample_rate, source=self._clock_terminal(),
+                                          sample_mode=nidaqmx.constants.AcquisitionType.CONTINUOUS,
+                                          samps_per_chan=buffer_samples)
+            ao.out_stream.regen_mode = nidaqmx.constants.RegenerationMode.DONT_ALLOW_REGENERATION
+            ao.out_stream.output_buf_size = buffer_samples
+
+            if self.edge_counter is not None:
+                channel = edges.ci_channels.add_ci_count_edges_chan(self.edge_counter, edge=self.trigger_edge)
+                channel.ci_count_edges_term = self.trigger_source
+
+            # Prefill the whole buffer before the first trigger can arrive
+            written = data_written = 0
+            pending = next(blocks, None)
+            while pending is not None and written + len(pending) <= buffer_samples:
+                ao.write(pending, auto_start=False)
+                written += len(pending)
+                pending = next(blocks, None)
+            data_written = written
+            if data_written == 0 and pending is None:
+                return BurstReport(0, 0, 0, 0, 0.0, 0.0, False, False)
+            tail_written = pending is None and written + len(tail) <= buffer_samples
+            if tail_written:
+                ao.write(tail, auto_start=False)
+                written += len(tail)
+
+            ao.start()
+            if self.edge_counter is not None:
+                edges.start()
+            clock.start()
+            started = time.perf_counter()
+            # Triggers counted before the clock was armed had no burst to miss
+            armed = edges.read() if self.edge_counter is not None else 0
+
+            underflow = False
+            line_period = 1 / (self.line_rate or self.sample_rate / n)
+            block_period = self.block_bursts * line_period
+            generated, triggers = 0, None
+            stalled = False
+
+            # Wait for room in the buffer; False once idle_timeout passes with
+            # no burst going out
+            def wait_for_space(needed):
+                last, last_change = ao.out_stream.total_samp_per_chan_generated, time.perf_counter()
+                while ao.out_stream.space_avail < needed:
+                    time.sleep(block_period / 4)
+                    progress = ao.out_stream.total_samp_per_chan_generated
+                    if progress != last:
+                        last, last_change = progress, time.perf_counter()
+                    elif time.perf_counter() - last_change > idle_timeout:
+                        return False
+                return True
+
+            try:
+                while pending is not None:
+                    if not wait_for_space(len(pending)):
+                        stalled = True
+                        break
+                    ao.write(pending, auto_start=False)
+                    written += len(pending)
+                    data_written += len(pending)
+                    pending = next(blocks, None)
+                if not stalled and not tail_written:
+                    if wait_for_space(len(tail)):
+                        ao.write(tail, auto_start=False)
+                        written += len(tail)
+                    else:
+                        stalled = True
+
+                # Drain, giving up if the triggers stop. The trigger count is
+                # latched together with the generated count as soon as the last
+                # data burst is out; the tail bursts still in the buffer answer
+                # any trigger in between, so none of those count as missed.
+                last, last_change = -1, time.perf_counter()
+                while True:
+                    if self.edge_counter is not None:
+                        triggers = edges.read() - armed
+                    generated = ao.out_stream.total_samp_per_chan_generated
+                    if generated >= data_written or stalled:
+                        break
+                    if generated != last:
+                        last, last_change = generated, time.perf_counter()
+                    elif time.perf_counter() - last_change > idle_timeout:
+                        stalled = True
+                        break
+                    remaining = (data_written - generated) / n * line_period
+                    time.sleep(max(min(block_period / 4, remaining / 2), line_period))
+            except nidaqmx.errors.DaqError as e:
+                if e.error_code not in UNDERFLOW_ERRORS:
+                    raise
+                # Every sample written went out before the buffer ran dry
+                underflow = True
+                generated = written
+            elapsed = time.perf_counter() - started
+
+            # Disarm the clock before stopping the output, so no further line
+            # trigger can clock the emptied buffer
+            for task in (clock, ao):
+                try:
+                    task.stop()
+                except nidaqmx.errors.DaqError as e:
+                    if e.error_code not in UNDERFLOW_ERRORS:
+                        raise
+                    underflow = True
+
+        bursts = min(generated, data_written) // n
+        missed = max(0, triggers - generated // n) if triggers is not None else None
+        report = BurstReport(data_written // n, bursts, triggers, missed, bursts / elapsed if elapsed else 0.0,
+                             elapsed, underflow, stalled)
+        if verbose:
+            print(format_burst_report(report))
+        return report
+
+def format_burst_report(report):
+    lines = [f"Bursts: {report.bursts_generated}/{report.bursts_written} generated in {report.elapsed:.3f} s "
+             f"({report.trigger_rate:.1f} lines/s sustained)"]
+    if report.triggers_seen is not None:
+        lines.append(f"Triggers: {report.triggers_seen} seen, {report.missed_triggers} without a burst")
+    if report.underflow:
+        lines.append("UNDERFLOW: a line trigger found the buffer empty")
+    if report.stalled:
+        lines.append("STALLED: no burst went out within idle_timeout, streaming was aborted")
+    return "\n".join(lines)
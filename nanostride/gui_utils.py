@@ -11,3 +11,162 @@ def show_error(msg):
     from tkinter import messagebox
     messagebox.showerror("Error", msg)
 
+
+# Slice viewer
+# Shows one slice on a matplotlib axis embedded in Tk. The image artist is
+# created once and updated with set_data, then blitted over a cached
+# background. Slider callbacks only record the requested layer; one redraw
+# per idle cycle draws whatever was asked for last. Decoded layers live in an
+# LRU cache capped at cache_bytes, and a background thread decodes the layers
+# around the current one, nearest first.
+class SliceViewer:
+    def __init__(self, axis, canvas, cache_bytes=256 * 1024 * 1024, prefetch_radius=8):
+        import threading
+        from collections import OrderedDict
+
+        self.axis = axis
+        self.canvas = canvas
+        self.cache_bytes = cache_bytes
+        self.prefetch_radius = prefetch_radius
+        self.files = []
+        self._cache = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+        self._image = None
+        self._background = None
+        self._pending = None
+        self._scheduled = False
+        self._center = None
+        self._layer_nbytes = None
+        self._failed = set()
+        self._wake = threading.Condition(self._lock)
+        self._closed = False
+        self._prefetcher = threading.Thread(target=self._prefetch_loop, name="slice-prefetch", daemon=True)
+        self._prefetcher.start()
+        canvas.mpl_connect("draw_event", self._on_draw)
+
+    def set_files(self, files):
+        with self._lock:
+            self.files = list(files)
+            self._cache.clear()
+            self._cached_bytes = 0
+            self._center = None
+            self._failed.clear()
+        # New stack, possibly a new shape: the next draw rebuilds the artist
+        if self._image is not None:
+            self._image.remove()
+            self._image = None
+
+    # Slider callback: remember the layer, draw at most once per idle cycle
+    def request(self, idx):
+        self._pending = idx
+        if not self._scheduled:
+            self._scheduled = True
+            self.canvas.get_tk_widget().after_idle(self._render)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._wake.notify()
+
+    def _decode(self, path):
+        import numpy as np
+        from PIL import Image
+        with Image.open(path) as img:
+            return np.asarray(img.convert("L"))
+
+    def _get(self, idx):
+        with self._lock:
+            layer = self._cache.get(idx)
+            if layer is not None:
+                self._cache.move_to_end(idx)
+                return layer
+            files = self.files
+        layer = self._decode(files[idx])
+        self._put(idx, layer, files)
+        return layer
+
+    # Dropped if the stack changed since files was taken
+    def _put(self, idx, layer, files):
+        with self._lock:
+            if files is not self.files or idx in self._cache:
+                return
+            self._cache[idx] = layer
+            self._cached_bytes += layer.nbytes
+            self._layer_nbytes = layer.nbytes
+            while self._cached_bytes > self.cache_bytes and len(self._cache) > 1:
+                _, old = self._cache.popitem(last=False)
+                self._cached_bytes -= old.nbytes
+
+    def _render(self):
+        self._scheduled = False
+        idx = self._pending
+        if idx is None or not self.files or not 0 <= idx < len(self.files):
+            return
+        layer = self._get(idx)
+        with self._lock:
+            self._center = idx
+            self._wake.notify()
+
+        if self._image is None or self._image.get_array().shape != layer.shape:
+            if self._image is not None:
+                self._image.remove()
+            self._image = self.axis.imshow(layer, vmin=0, vmax=255, animated=True)
+            self.canvas.draw()
+            return
+        self._image.set_data(layer)
+        if self._background is None:
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self._background)
+        self.axis.draw_artist(self._image)
+        self.canvas.blit(self.axis.bbox)
+
+    # Full redraws (first show, resize) refresh the blit background
+    def _on_draw(self, event):
+        self._background = self.canvas.copy_from_bbox(self.axis.bbox)
+        if self._image is not None:
+            self.axis.draw_artist(self._image)
+
+    # Nearest missing layer in the window around the current one. The window
+    # shrinks to fit the cache, and layers already in it are marked recently
+    # used so prefetching never evicts its own work.
+    def _next_to_prefetch(self):
+        center, count = self._center, len(self.files)
+        if center is None:
+            return None
+        radius = self.prefetch_radius
+        if self._layer_nbytes:
+            radius = min(radius, (self.cache_bytes // self._layer_nbytes - 1) // 2)
+        missing = None
+        for offset in range(1, radius + 1):
+            for idx in (center + offset, center - offset):
+                if not 0 <= idx < count or idx in self._failed:
+                    continue
+                if idx in self._cache:
+                    self._cache.move_to_end(idx)
+                elif missing is None:
+                    missing = idx
+        if center in self._cache:
+            self._cache.move_to_end(center)
+        return missing
+
+    def _prefetch_loop(self):
+        while True:
+            with self._lock:
+                idx = self._next_to_prefetch()
+                while idx is None and not self._closed:
+                    self._wake.wait()
+                    idx = self._next_to_prefetch()
+                if self._closed:
+                    return
+                files = self.files
+            # Any decode failure only skips that layer, the thread carries on
+            try:
+                layer = self._decode(files[idx])
+            except Exception:
+                with self._lock:
+                    if files is self.files:
+                        self._failed.add(idx)
+                continue
+            self._put(idx, layer, files)
@@ -1,26 +1,132 @@
-import nidaqmx
+import time
+from collections import deque
+from contextlib import contextmanager
+import numpy as np
+try:
+    from .backends import load_driver
+except ImportError:
+    from backends import load_driver
+
+nidaqmx = load_driver("nidaqmx")
+
+# Persistent laser control
+# The shutter and resonant scanner AO channels are reserved once, each in its
+# own long-lived task, so switching is a single write instead of creating,
+# configuring and destroying a task every time. Every switch is timed and the
+# latencies are kept (last history_size per channel) for histograms.
+class LaserController:
+    def __init__(self, device="PXI1Slot2", shutter_channel="ao1", scanner_channel="ao0",
+                 shutter_on=5.0, scanner_on=4.0, history_size=10000):
+        self.device = device
+        self.channels = {"shutter": f"{device}/{shutter_channel}", "scanner": f"{device}/{scanner_channel}"}
+        self.on_levels = {"shutter": shutter_on, "scanner": scanner_on}
+        self.states = {"shutter": "OFF", "scanner": "OFF"}
+        self.latencies = {name: deque(maxlen=history_size) for name in self.channels}
+        self._tasks = {}
+        for name in self.channels:
+            self._open(name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _open(self, name):
+        task = nidaqmx.Task()
+        task.ao_channels.add_ao_voltage_chan(self.channels[name])
+        task.start()
+        self._tasks[name] = task
+
+    def _set(self, name, state):
+        if state not in ("ON", "OFF"):
+            raise ValueError(f"{name} state must be 'ON' or 'OFF', got {state}")
+        start = time.perf_counter()
+        self._tasks[name].write(self.on_levels[name] if state == "ON" else 0.0)
+        self.latencies[name].append(time.perf_counter() - start)
+        self.states[name] = state
+
+    def set_shutter(self, state):
+        self._set("shutter", state)
+
+    def set_scanner(self, state):
+        self._set("scanner", state)
+
+    # Counts per bin of switch latency, bins in seconds (log-spaced 10 us to 100 ms by default)
+    def latency_histogram(self, name="shutter", bins=None):
+        if bins is None:
+            bins = np.logspace(-5, -1, 17)
+        return np.histogram(np.asarray(self.latencies[name]), bins=bins)
+
+    def latency_report(self):
+        lines = []
+        for name, samples in self.latencies.items():
+            if not samples:
+                lines.append(f"{name:<8} no switches recorded")
+                continue
+            us = np.asarray(samples) * 1e6
+            lines.append(f"{name:<8} n={len(us):<6} median {np.median(us):8.1f} us  "
+                         f"p99 {np.percentile(us, 99):8.1f} us  max {us.max():8.1f} us")
+        return "\n".join(lines)
+
+    # Hardware-timed shutter gating: gate (one value per sample, truthy = open)
+    # is played on the shutter channel at sample_rate. sample_clock_source and
+    # trigger_source let it share a clock and start trigger with the pixel
+    # waveform, e.g. "/PXI1Slot2/PFI1" and "/PXI1Slot2/PFI0".
+    def play_shutter_sequence(self, gate, sample_rate, sample_clock_source="", trigger_source=None,
+                              timeout=10.0):
+        levels = np.where(np.asarray(gate).astype(bool), self.on_levels["shutter"], 0.0)
+        with self.lend_shutter():
+            with nidaqmx.Task() as task:
+                task.ao_channels.add_ao_voltage_chan(self.channels["shutter"])
+                task.timing.cfg_samp_clk_timing(
+                    sample_rate,
+                    source=sample_clock_source,
+                    sample_mode=nidaqmx.constants.AcquisitionType.FINITE,
+                    samps_per_chan=len(levels),
+                )
+                if trigger_source is not None:
+                    task.triggers.start_trigger.cfg_dig_edge_start_trig(trigger_source)
+                task.write(levels, auto_start=False)
+                task.start()
+                task.wait_until_done(timeout=timeout)
+
+    # Frees the shutter channel for a hardware-timed task and reopens it,
+    # closed, afterwards
+    @contextmanager
+    def lend_shutter(self):
+        self._tasks.pop("shutter").close()
+        try:
+            yield self.channels["shutter"]
+        finally:
+            self._open("shutter")
+            self._tasks["shutter"].write(0.0)
+            self.states["shutter"] = "OFF"
+
+    def close(self):
+        for task in self._tasks.values():
+            task.write(0.0)
+            task.close()
+        self._tasks.clear()
+
+
+# Module-level switches used by the GUI, backed by one shared controller
+_controller = None
+
+def laser_controller():
+    global _controller
+    if _controller is None:
+        _controller = LaserController()
+    return _controller
 
 def toggle_shutter(shutter_state):
-    device = 'PXI1Slot2'
-    ao_channel = "ao1"
-    with nidaqmx.Task() as ao_task:
-        ao_task.ao_channels.add_ao_voltage_chan(f"{device}/{ao_channel}")
-        if shutter_state == "ON":
-            ao_task.write(5.0)
-            ao_task.stop()
-        elif shutter_state == "OFF":
-            ao_task.write(0.0)
-            ao_task.stop()
+    laser_controller().set_shutter(shutter_state)
 
 def toggle_resonance_scanner(scanner_state):
-    device = 'PXI1Slot2'
-    ao_channel = "ao0"
-    with nidaqmx.Task() as ao_task:
-        ao_task.ao_channels.add_ao_voltage_chan(f"{device}/{ao_channel}")
-        if scanner_state == "ON":
-            ao_task.write(4.0)
-            ao_task.stop()
-        elif scanner_state == "OFF":
-            ao_task.write(0.0)
-            ao_task.stop()
-    
\ No newline at end of file
+    laser_controller().set_scanner(scanner_state)
+
+def close_laser():
+    global _controller
+    if _controller is not None:
+        _controller.close()
+        _controller = None
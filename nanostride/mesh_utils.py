@@ -0,0 +1,94 @@
+import os
+import hashlib
+import numpy as np
+
+# Preview meshes
+# The GUI only needs a picture of the part, so it draws a decimated copy of the
+# STL. Decimation is by vertex clustering: vertices are snapped to a grid, every
+# cell collapses to the mean of its vertices, and triangles that collapse to a
+# line or point (or duplicate another) are dropped. The grid is refined until
+# the result fits the triangle budget, which is a hard cap: if even two cells
+# per axis give too many, the grid is flattened one axis at a time, thinnest
+# first, down to a single cell with no triangles at all. The STL on disk is
+# never touched, so slicing always sees the full-resolution mesh.
+PREVIEW_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".nanostride", "preview_cache")
+PREVIEW_TRIANGLES = 50000
+
+# Cluster id of every vertex, and the surviving triangles as cluster id triples.
+# grid is the cell count, for all axes or per axis.
+def _cluster(vertices, lo, extent, grid):
+    grid = np.broadcast_to(np.asarray(grid, dtype=np.int64), (3,))
+    cells = np.minimum(((vertices - lo) / extent * grid).astype(np.int64), grid - 1)
+    keys = (cells[:, 0] * grid[1] + cells[:, 1]) * grid[2] + cells[:, 2]
+    _, inverse = np.unique(keys, return_inverse=True)
+    ids = inverse.reshape(-1, 3)
+
+    # Drop triangles with two corners in one cell, then duplicates
+    keep = (ids[:, 0] != ids[:, 1]) & (ids[:, 1] != ids[:, 2]) & (ids[:, 0] != ids[:, 2])
+    ids = ids[keep]
+    _, first = np.unique(np.sort(ids, axis=1), axis=0, return_index=True)
+    return inverse, ids[np.sort(first)]
+
+def decimate(vectors, max_triangles=PREVIEW_TRIANGLES, iterations=8):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if len(vectors) <= max_triangles:
+        return vectors
+
+    vertices = vectors.reshape(-1, 3)
+    lo = vertices.min(axis=0)
+    extent = np.maximum(vertices.max(axis=0) - lo, 1e-9)
+
+    # A surface through g^3 cells keeps on the order of g^2 triangles: start
+    # from the budget and correct the grid by the square root of the miss
+    grid = max(2, int(np.sqrt(max_triangles / 2)))
+    best = None
+    for _ in range(iterations):
+        inverse, ids = _cluster(vertices, lo, extent, grid)
+        if len(ids) <= max_triangles:
+            if best is None or len(ids) > len(best[1]):
+                best = (inverse, ids)
+            if len(ids) > 0.9 * max_triangles:
+                break
+        step = np.sqrt(max_triangles / max(len(ids), 1))
+        grid = max(2, int(grid * min(max(step, 0.5), 2.0)))
+    if best is None:
+        grid = np.full(3, 2)
+        best = _cluster(vertices, lo, extent, grid)
+        for axis in np.argsort(extent):
+            if len(best[1]) <= max_triangles:
+                break
+            grid[axis] = 1
+            best = _cluster(vertices, lo, extent, grid)
+
+    # Each cell is represented by the mean of the vertices snapped into it
+    inverse, ids = best
+    counts = np.bincount(inverse)
+    means = np.stack([np.bincount(inverse, weights=vertices[:, axis]) for axis in range(3)], axis=1)
+    means /= counts[:, None]
+    return means[ids].astype(np.float32)
+
+def stl_hash(stl_path):
+    h = hashlib.sha256()
+    with open(stl_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+# Decimated triangles (n, 3, 3) for an STL, cached per file content and budget
+def preview_mesh(stl_path, max_triangles=PREVIEW_TRIANGLES, cache_dir=PREVIEW_CACHE_DIR):
+    entry = None
+    if cache_dir is not None:
+        entry = os.path.join(cache_dir, f"{stl_hash(stl_path)}_{max_triangles}.npy")
+        if os.path.exists(entry):
+            return np.load(entry)
+
+    from stl import mesh
+    preview = decimate(mesh.Mesh.from_file(stl_path).vectors, max_triangles)
+
+    if entry is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write then rename so a half-written preview is never loaded
+        staging = entry + ".tmp.npy"
+        np.save(staging, preview)
+        os.replace(staging, entry)
+    return preview
@@ -1,37 +1,125 @@
-import SPiiPlusPython as sp
-import pipython
+import threading
+import time
+import numpy as np
+try:
+    from .backends import load_driver
+    from .toolpath_utils import plan_trajectory
+except ImportError:
+    from backends import load_driver
+    from toolpath_utils import plan_trajectory
+
+sp = load_driver("SPiiPlusPython")
+pipython = load_driver("pipython")
+
+# Spline vertices the controller queues ahead of the running motion
+SPLINE_QUEUE_DEPTH = 50
 
 
 class StageController:
     def __init__(self, stage_port, stage_baud=115200):
         self.hc = sp.OpenCommSerial(stage_port, stage_baud)
+        # One command at a time on the serial link; held by whoever is talking
+        self.link = threading.RLock()
 
     def zero_stage(self):
-        sp.RunBuffer(self.hc, 1, "STARTUP", sp.SYNCHRONOUS, True)
+        with self.link:
+            sp.RunBuffer(self.hc, 1, "STARTUP", sp.SYNCHRONOUS, True)
     
     def close_stage(self):
-        sp.DisableAll(self.hc, sp.SYNCHRONOUS, True)
-        sp.CloseComm(self.hc)
+        with self.link:
+            sp.DisableAll(self.hc, sp.SYNCHRONOUS, True)
+            sp.CloseComm(self.hc)
         
     def get_stage_pos(self):
-        x_pos = sp.GetTargetPosition(self.hc, 0, sp.SYNCHRONOUS)
-        y_pos = sp.GetTargetPosition(self.hc, 1, sp.SYNCHRONOUS)
+        with self.link:
+            x_pos = sp.GetTargetPosition(self.hc, 0, sp.SYNCHRONOUS)
+            y_pos = sp.GetTargetPosition(self.hc, 1, sp.SYNCHRONOUS)
         return x_pos, y_pos
 
     def move_stage_to_point(self, x, y, velocity=20, endVelocity=0):
-        sp.ExtToPointM(
-            self.hc,
-            sp.MotionFlags.ACSC_AMF_VELOCITY | sp.MotionFlags.ACSC_AMF_ENDVELOCITY,
-            [0,1,-1],
-            point=[x,y],
-            velocity=velocity,
-            endVelocity= 0,
-            failure_check=True
-        )
+        with self.link:
+            sp.ExtToPointM(
+                self.hc,
+                sp.MotionFlags.ACSC_AMF_VELOCITY | sp.MotionFlags.ACSC_AMF_ENDVELOCITY,
+                [0,1,-1],
+                point=[x,y],
+                velocity=velocity,
+                endVelocity= 0,
+                failure_check=True
+            )
+
+    # Run a whole XY polyline as one cubic PVT spline: the controller blends
+    # through every vertex at the speed plan_trajectory allows instead of
+    # stopping at each one. on_progress(vertex, num_vertices) is called every
+    # progress_interval seconds from the planned timeline, so following the
+    # path costs no serial traffic. Returns the planned duration in seconds.
+    def run_trajectory(self, points, velocity=20, acceleration=500, junction_deviation=0.005,
+                       on_progress=None, progress_interval=0.1, wait=True, queue_depth=SPLINE_QUEUE_DEPTH):
+        points, velocities, intervals = plan_trajectory(points, velocity, acceleration, junction_deviation)
+        axes = [0, 1, -1]
+
+        # Get to the start of the path first, the spline begins at rest there
+        self.move_stage_to_point(*points[0], velocity=velocity)
+        sp.WaitLogicalMotionEnd(self.hc, 0, 60000)
+        sp.WaitLogicalMotionEnd(self.hc, 1, 60000)
+
+        # ACSC_AMF_WAIT holds the motion while the controller's queue is
+        # prefilled, so it does not start on one point and starve while the
+        # rest trickle in over the link. GoM then starts it and the clock, and
+        # every further point is sent as soon as the motion frees a slot, a
+        # full queue ahead of where the axes are.
+        segments = list(zip(points[1:], velocities[1:], intervals[1:]))
+        times = np.cumsum(intervals)
+        duration = float(times[-1])
+        with self.link:
+            sp.SplineM(self.hc, sp.MotionFlags.ACSC_AMF_WAIT | sp.MotionFlags.ACSC_AMF_CUBIC |
+                       sp.MotionFlags.ACSC_AMF_VARTIME, axes, 0, failure_check=True)
+            for point, vel, dt in segments[:queue_depth]:
+                sp.AddPVTPointM(self.hc, axes, tuple(point), tuple(vel), dt * 1000)
+            if len(segments) <= queue_depth:
+                sp.EndSequenceM(self.hc, axes)
+            sp.GoM(self.hc, axes)
+            started = time.perf_counter()
+
+        # Point k fits once point k - queue_depth has been executed
+        def feed():
+            for k in range(queue_depth, len(segments)):
+                delay = started + times[k + 1 - queue_depth] - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                point, vel, dt = segments[k]
+                with self.link:
+                    sp.AddPVTPointM(self.hc, axes, tuple(point), tuple(vel), dt * 1000)
+            with self.link:
+                sp.EndSequenceM(self.hc, axes)
+
+        def follow():
+            if len(segments) > queue_depth:
+                feeder = threading.Thread(target=feed, name="trajectory-feed", daemon=True)
+                feeder.start()
+            while on_progress is not None:
+                elapsed = time.perf_counter() - started
+                if elapsed >= duration:
+                    break
+                on_progress(int(np.searchsorted(times, elapsed, side="right")) - 1, len(points))
+                time.sleep(progress_interval)
+            if len(segments) > queue_depth:
+                feeder.join()
+            sp.WaitLogicalMotionEnd(self.hc, 0, int((duration + 10) * 1000))
+            sp.WaitLogicalMotionEnd(self.hc, 1, int((duration + 10) * 1000))
+            if on_progress is not None:
+                on_progress(len(points) - 1, len(points))
+
+        self.trajectory = threading.Thread(target=follow, name="trajectory-progress", daemon=True)
+        self.trajectory.start()
+        if wait:
+            self.trajectory.join()
+        return duration
 
 class HexapodController:
     def __init__(self, hexapod_port, hexapod_baud=115200):
         self.hp = pipython.GCS2Device('C-887')
+        self.link = threading.RLock()
         try:
             self.hp.ConnectRS232(hexapod_port, hexapod_baud)
             self.connected = True
@@ -43,20 +131,124 @@ class HexapodController:
         if not self.connected:
             raise RuntimeError("Hexapod not connected.")
         axes = ['X', 'Y', 'Z', 'U', 'V', 'W']
-        for axis in axes:
-            self.hp.MOV(axis, 0)
+        with self.link:
+            self.hp.MOV({axis: 0 for axis in axes})
 
     def close(self):
         if self.connected:
             try:
-                self.hp.CloseConnection()
+                with self.link:
+                    self.hp.CloseConnection()
                 self.connected = False
             except Exception as e:
                 print(f"Error closing hexapod: {e}")
 
     def get_hexapod_pos(self):
-        return self.hp.qPOS(['X', 'Y', 'Z', 'U', 'V', 'W'])
+        with self.link:
+            return self.hp.qPOS(['X', 'Y', 'Z', 'U', 'V', 'W'])
 
+    # All axes go out in one MOV, so they start together and move as one pose change
     def move_hexapod(self, positions):
-        for pos in positions:
-            self.hp.MOV(pos, positions[pos])
+        with self.link:
+            self.hp.MOV(dict(positions))
+
+    # Offsets from the current target, applied by the controller (MVR), no qPOS first
+    def move_hexapod_relative(self, offsets):
+        with self.link:
+            self.hp.MVR(dict(offsets))
+
+    def wait_on_target(self, timeout=60, poll_interval=0.05):
+        deadline = time.perf_counter() + timeout
+        while True:
+            with self.link:
+                if all(self.hp.qONT().values()):
+                    return
+            if time.perf_counter() > deadline:
+                raise TimeoutError("Hexapod did not reach its target.")
+            time.sleep(poll_interval)
+
+    # Move through poses back to back: one MOV per pose, the next sent as soon
+    # as the controller reports on target. on_pose(i) is called after each.
+    def run_pose_sequence(self, poses, dwell=0.0, timeout=60, poll_interval=0.05, on_pose=None):
+        for i, pose in enumerate(poses):
+            self.move_hexapod(pose)
+            self.wait_on_target(timeout, poll_interval)
+            if on_pose is not None:
+                on_pose(i)
+            if dwell:
+                time.sleep(dwell)
+
+
+# Background position polling
+# Reads stage and hexapod positions on its own thread and keeps the latest of
+# each, so the GUI never waits on the serial links. A poll only goes ahead if
+# the link is free: when a move (or anything else) holds it, or the read fails,
+# that device's interval doubles up to max_interval, and drops back to the
+# base rate after the next successful read.
+class PositionPoller:
+    def __init__(self, stages=None, hexapod=None, rate=20, max_interval=1.0):
+        self.stages = stages
+        self.hexapod = hexapod
+        self.interval = 1.0 / rate
+        self.max_interval = max_interval
+        self._lock = threading.Lock()
+        self._latest = {"stage": None, "hexapod": None}
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="position-poller", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def set_rate(self, rate):
+        self.interval = 1.0 / rate
+
+    # Latest reading for "stage" or "hexapod" as (position, timestamp), or None
+    def latest(self, device):
+        with self._lock:
+            return self._latest[device]
+
+    def _read(self, device):
+        if device == "stage":
+            controller = self.stages
+            read = controller.get_stage_pos if controller is not None else None
+        else:
+            controller = self.hexapod
+            if controller is not None and not controller.connected:
+                controller = None
+            read = controller.get_hexapod_pos if controller is not None else None
+        if controller is None:
+            return None
+        if not controller.link.acquire(blocking=False):
+            raise BlockingIOError(f"{device} link busy")
+        try:
+            return read()
+        finally:
+            controller.link.release()
+
+    def _run(self):
+        intervals = {"stage": self.interval, "hexapod": self.interval}
+        due = {"stage": 0.0, "hexapod": 0.0}
+        while not self._stopped.is_set():
+            now = time.perf_counter()
+            for device in due:
+                if now < due[device]:
+                    continue
+                try:
+                    position = self._read(device)
+                    intervals[device] = self.interval
+                    with self._lock:
+                        self._latest[device] = None if position is None else (position, time.time())
+                except Exception:
+                    intervals[device] = min(intervals[device] * 2, self.max_interval)
+                due[device] = time.perf_counter() + intervals[device]
+            self._stopped.wait(max(0.0, min(due.values()) - time.perf_counter()))
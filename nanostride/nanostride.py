@@ -5,18 +5,21 @@ import gui_utils
 import motion_utils
 import laser_utils
 import slicer_utils
+import mesh_utils
 from matplotlib.figure import Figure
 from mpl_toolkits.mplot3d.art3d import Poly3DCollection
-from stl import mesh
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.image as mpimg
 import glob
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 # HELPER FUNCTIONS
 def set_light(canvas, color):
     canvas.itemconfig("light", fill=color)
 def close_and_kill():
+    poller.stop()
+    slice_viewer.close()
+    laser_utils.close_laser()
     if 'hexapod' in globals():
         hexapod.close()
     if 'stages' in globals():
@@ -35,6 +38,7 @@ def connect_stages():
         try:
             stages = motion_utils.StageController(port_num)
             if stages.hc >= 0:
+                poller.stages = stages
                 print('Connection success')
                 set_light(stage_light, 'green')
             else:
@@ -53,14 +57,15 @@ def initialize_stages():
         gui_utils.show_error("Stages not connected yet.")
     except Exception as e:
         gui_utils.show_error(f"Initialization failed: {str(e)}")
+# Positions come from the background poller, reading them never touches the serial link
 def update_stage_position():
-    try:
-        if 'stages' in globals() and stages is not None:
-            x_pos, y_pos = stages.get_stage_pos()  # your function
-            stage_position_label.config(text=f"X: {x_pos:.4f}, Y: {y_pos:.4f}")
-    except Exception as e:
+    latest = poller.latest("stage")
+    if latest is not None:
+        x_pos, y_pos = latest[0]
+        stage_position_label.config(text=f"X: {x_pos:.4f}, Y: {y_pos:.4f}")
+    else:
         stage_position_label.config(text="X: ---, Y: ---")
-    root.after(20, update_stage_position)  # repeat every 200 ms
+    root.after(POSITION_REFRESH_MS, update_stage_position)
 
 def move_stage():
     desired_stage_x = stage_x_entry.get()
@@ -90,6 +95,7 @@ def connect_hexapod():
         try:
             hexapod = motion_utils.HexapodController(port_num)
             if hexapod.connected:
+                poller.hexapod = hexapod
                 print("Connection success")
                 set_light(hexapod_light, 'green')
             else:
@@ -112,13 +118,11 @@ def initialize_hexapod():
     except Exception as e:
         gui_utils.show_error(f"Initialization failed: {str(e)}")
 def update_hexapod_position():
-    try:
-        if 'hexapod' in globals() and hexapod is not None:
-            hexapod_positions = hexapod.get_hexapod_pos()
-            hexapod_position_label.config(text=f"X: {hexapod_positions['X']:.4f}, Y: {hexapod_positions['Y']:.4f}, Z: {hexapod_positions['Z']:.4f}\nU: {hexapod_positions['U']:.4f}, V: {hexapod_positions['V']:.4f}, W: {hexapod_positions['W']:.4f}")
-    except Exception as e:
-        hexapod_position_label.config(text=e)
-    root.after(20, update_hexapod_position)
+    latest = poller.latest("hexapod")
+    if latest is not None:
+        hexapod_positions = latest[0]
+        hexapod_position_label.config(text=f"X: {hexapod_positions['X']:.4f}, Y: {hexapod_positions['Y']:.4f}, Z: {hexapod_positions['Z']:.4f}\nU: {hexapod_positions['U']:.4f}, V: {hexapod_positions['V']:.4f}, W: {hexapod_positions['W']:.4f}")
+    root.after(POSITION_REFRESH_MS, update_hexapod_position)
 def move_hexapod():
     def get_desired_positions():
         return {
@@ -127,33 +131,9 @@ def move_hexapod():
         }
     hexapod.move_hexapod(get_desired_positions())
 def relative_move_hexapod(axis):
-    hexapod_positions = hexapod.get_hexapod_pos()
     step = float(hexapod_step_entry.get())
-    if axis == "+X":
-        hexapod_positions['X'] += step
-    elif axis == "-X":
-        hexapod_positions['X'] -= step
-    elif axis == "+Y":
-        hexapod_positions['Y'] += step
-    elif axis == "-Y":
-        hexapod_positions['Y'] -= step
-    elif axis == "+Z":
-        hexapod_positions['Z'] += step
-    elif axis == "-Z":
-        hexapod_positions['Z'] -= step
-    elif axis == "+U":
-        hexapod_positions['U'] += step
-    elif axis == "-U":
-        hexapod_positions['U'] -= step
-    elif axis == "+V":
-        hexapod_positions['V'] += step
-    elif axis == "-V":
-        hexapod_positions['V'] -= step
-    elif axis == "+W":
-        hexapod_positions['W'] += step
-    elif axis == "-W":
-        hexapod_positions['W'] -= step
-    hexapod.move_hexapod(hexapod_positions)
+    sign = 1 if axis[0] == "+" else -1
+    hexapod.move_hexapod_relative({axis[1]: sign * step})
 
 # Laser
 shutter_state = "OFF"
@@ -247,34 +227,47 @@ def open_stl():
     if file_path is not None:
         plot()
 
+# The preview is a decimated copy of the STL built off the Tk thread; the full
+# mesh is only ever read by the slicer
+PREVIEW_TRIANGLES = 50000
+preview_pool = ThreadPoolExecutor(max_workers=1)
+preview_job = None
+
 def plot():
-    global ax
+    global preview_job
     if file_path is None:
         return
+    preview_job = preview_pool.submit(mesh_utils.preview_mesh, file_path, PREVIEW_TRIANGLES)
+    root.after(50, draw_preview, preview_job)
+
+def draw_preview(job):
+    if job is not preview_job:
+        return  # a newer file was opened
+    if not job.done():
+        root.after(50, draw_preview, job)
+        return
 
     try:
+        vectors = job.result()
+
         # clear out the old contents
         ax.cla()
-
-        # load and draw your mesh
-        your_mesh = mesh.Mesh.from_file(file_path)
         ax.add_collection3d(Poly3DCollection(
-            your_mesh.vectors,
+            vectors,
             facecolors='lightgreen',
-            edgecolors='black',
-            linewidths=0.2,
+            linewidths=0,
             alpha=0.9
         ))
 
         # rescale & label
-        scale = your_mesh.points.flatten()
+        scale = vectors.reshape(-1)
         ax.auto_scale_xyz(scale, scale, scale)
         ax.set_xlabel('X')
         ax.set_ylabel('Y')
         ax.set_zlabel('Z')
 
         # redraw the canvas
-        canvas.draw()
+        canvas.draw_idle()
     except Exception as e:
         print("Plot error:", e)
 
@@ -307,17 +300,14 @@ def show_slices():
         raise RuntimeError(f"No images found")
         # re-configure the slider to match new number of files
     max_idx = len(image_files) - 1
+    slice_viewer.set_files(image_files)
     slider.config(from_=max_idx, to=0)  # top of slider = last slice
     slider.set(0)                       # start at slice 0
     show_image(0)
 
 def show_image(idx):
     if image_files:
-        img = mpimg.imread(image_files[idx])
-        axis.clear()
-        axis.imshow(img)
-        axis.axis("on")           
-        slice_canvas.draw()
+        slice_viewer.request(idx)
 
 # --- slider callback ---
 def on_slider_change(val):
@@ -332,6 +322,12 @@ def on_slider_change(val):
 root = Tk()
 root.title("NanoStride")
 
+# Serial polling rate (Hz) and how often the labels redraw from the cache
+POSITION_POLL_RATE = 20
+POSITION_REFRESH_MS = 50
+poller = motion_utils.PositionPoller(rate=POSITION_POLL_RATE)
+poller.start()
+
 #########################################################################
 # Motion control frame
 #########################################################################
@@ -543,6 +539,7 @@ slice_fig = Figure(figsize=(5,5), dpi=100, facecolor="#f0f0f0")
 axis = slice_fig.add_subplot(111)
 slice_canvas = FigureCanvasTkAgg(slice_fig, master=file_processing_frame)
 slice_canvas.get_tk_widget().grid(row=0, column=1)
+slice_viewer = gui_utils.SliceViewer(axis, slice_canvas)
 
 # --- create the slider ---
 slider = ttk.Scale(
@@ -0,0 +1,279 @@
+import time
+from enum import Enum
+from types import SimpleNamespace
+import numpy as np
+
+# In-process stand-in for an NI DAQ card driven through nidaqmx.
+# Task creation, start and stop cost the latencies below; hardware-timed
+# output plays written samples at the configured sample clock.
+TASK_CREATE_LATENCY = 0.010      # s
+CHANNEL_ADD_LATENCY = 0.002
+START_LATENCY = 0.003
+STOP_LATENCY = 0.002
+WRITE_LATENCY = 0.0005
+WRITE_BANDWIDTH = 100e6          # bytes/s of float64 samples over PXI
+ONBOARD_FIFO_SAMPLES = 8191
+# External line trigger seen on every PFI terminal (resonant mirror line rate)
+TRIGGER_RATE = 7910.0            # Hz
+
+# Last value written to every channel, across tasks, so tests can read it back
+channel_values = {}
+# Running counter tasks by output terminal, for tasks that use them as a clock
+_counter_outputs = {}
+
+
+class AcquisitionType(Enum):
+    FINITE = 0
+    CONTINUOUS = 1
+    HW_TIMED_SINGLE_POINT = 2
+
+class Edge(Enum):
+    RISING = 0
+    FALLING = 1
+
+class RegenerationMode(Enum):
+    ALLOW_REGENERATION = 0
+    DONT_ALLOW_REGENERATION = 1
+
+class Level(Enum):
+    LOW = 0
+    HIGH = 1
+
+constants = SimpleNamespace(AcquisitionType=AcquisitionType, Edge=Edge,
+                            RegenerationMode=RegenerationMode, Level=Level)
+
+
+class DaqError(Exception):
+    def __init__(self, message, error_code=-200000, task_name=""):
+        super().__init__(message)
+        self.error_code = error_code
+
+errors = SimpleNamespace(DaqError=DaqError)
+
+
+class _ChannelCollection(list):
+    def __init__(self, task):
+        super().__init__()
+        self._task = task
+
+    def _add(self, name):
+        time.sleep(CHANNEL_ADD_LATENCY)
+        for physical in name.split(","):
+            self.append(physical.strip())
+        return self
+
+    def add_ao_voltage_chan(self, physical_channel, name_to_assign_to_channel="", min_val=-10.0, max_val=10.0, **kwargs):
+        return self._add(physical_channel)
+
+    def add_do_chan(self, lines, name_to_assign_to_lines="", **kwargs):
+        return self._add(lines)
+
+    def add_co_pulse_chan_freq(self, counter, name_to_assign_to_channel="", freq=1.0, duty_cycle=0.5,
+                               idle_state=Level.LOW, initial_delay=0.0, **kwargs):
+        self._task._pulse_freq = freq
+        return self._add(counter)
+
+    def add_ci_count_edges_chan(self, counter, name_to_assign_to_channel="", edge=Edge.RISING,
+                                initial_count=0, **kwargs):
+        return self._add(counter)
+
+
+class _Timing:
+    def __init__(self):
+        self.samp_clk_rate = None
+        self.samp_quant_samp_mode = None
+        self.samp_quant_samp_per_chan = None
+        self.samp_clk_src = ""
+
+    def cfg_samp_clk_timing(self, rate, source="", active_edge=Edge.RISING,
+                            sample_mode=AcquisitionType.FINITE, samps_per_chan=1000):
+        self.samp_clk_rate = rate
+        self.samp_quant_samp_mode = sample_mode
+        self.samp_quant_samp_per_chan = samps_per_chan
+        self.samp_clk_src = source
+
+    def cfg_implicit_timing(self, sample_mode=AcquisitionType.FINITE, samps_per_chan=1000):
+        self.samp_quant_samp_mode = sample_mode
+        self.samp_quant_samp_per_chan = samps_per_chan
+
+
+class _StartTrigger:
+    def __init__(self):
+        self.source = None
+        self.edge = None
+        self.retriggerable = False
+
+    def cfg_dig_edge_start_trig(self, trigger_source, trigger_edge=Edge.RISING):
+        self.source = trigger_source
+        self.edge = trigger_edge
+
+
+class _OutStream:
+    def __init__(self, task):
+        self._task = task
+        self.regen_mode = RegenerationMode.ALLOW_REGENERATION
+        self.output_buf_size = 0
+        self.output_onbrd_buf_size = ONBOARD_FIFO_SAMPLES
+
+    @property
+    def total_samp_per_chan_generated(self):
+        self._task._check_underflow()
+        return self._task._generated()
+
+    @property
+    def space_avail(self):
+        self._task._check_underflow()
+        return self.output_buf_size - (self._task._written - self._task._generated())
+
+
+class Task:
+    def __init__(self, new_task_name=""):
+        time.sleep(TASK_CREATE_LATENCY)
+        self.name = new_task_name
+        self.ao_channels = _ChannelCollection(self)
+        self.do_channels = _ChannelCollection(self)
+        self.timing = _Timing()
+        self.triggers = SimpleNamespace(start_trigger=_StartTrigger())
+        self.ci_channels = _ChannelCollection(self)
+        self.co_channels = _ChannelCollection(self)
+        self.out_stream = _OutStream(self)
+        self._running = False
+        self._started_at = None
+        self._samples = None
+        self._pulse_freq = None
+        self._stopped_at = None
+        self._written = 0
+        self._generated_before = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def channel_names(self):
+        return list(self.ao_channels) + list(self.do_channels)
+
+    # Rate at which this task's sample clock ticks and the window it ticks in.
+    # A clock taken from a retriggerable counter ticks in bursts, one burst per
+    # line trigger the counter is free to accept (triggers during a burst are
+    # lost), and only while the counter runs.
+    def _clock(self):
+        source = self.timing.samp_clk_src or ""
+        now = time.perf_counter()
+        counter = _counter_outputs.get(source.lstrip("/"))
+        if counter is None:
+            return self.timing.samp_clk_rate or 0.0, self._started_at, now
+        rate = counter._bursts_per_second() * counter.timing.samp_quant_samp_per_chan
+        until = counter._stopped_at if not counter._running else now
+        return rate, max(self._started_at, counter._started_at), until
+
+    def _bursts_per_second(self):
+        burst = self.timing.samp_quant_samp_per_chan / self._pulse_freq
+        if not self.triggers.start_trigger.retriggerable:
+            return 0.0
+        return TRIGGER_RATE / max(1, int(np.ceil(burst * TRIGGER_RATE + 1e-9)))
+
+    def _streaming(self):
+        return (self.timing.samp_quant_samp_mode == AcquisitionType.CONTINUOUS
+                and self.out_stream.regen_mode == RegenerationMode.DONT_ALLOW_REGENERATION)
+
+    # Sample clock ticks since the task was first started
+    def _ticks(self):
+        if not self._running or self._started_at is None:
+            return self._generated_before
+        rate, since, until = self._clock()
+        return self._generated_before + int(max(0.0, until - since) * rate)
+
+    def _generated(self):
+        ticks = self._ticks()
+        return min(ticks, self._written) if self._streaming() else ticks
+
+    # Generation ran past the written data: in hardware this is an underflow
+    def _consumed_all(self):
+        return self._streaming() and self._ticks() > self._written
+
+    def _check_underflow(self):
+        if self._running and self._consumed_all():
+            raise DaqError("Attempted to write samples that have already been generated "
+                           "(buffer underflow).", error_code=-200290)
+
+    def write(self, data, auto_start=True, timeout=10.0):
+        time.sleep(WRITE_LATENCY)
+        data = np.asarray(data, dtype=float)
+        channels = self.channel_names
+        if self.timing.samp_clk_rate is None:
+            # On-demand: one value per channel, applied immediately
+            values = np.atleast_1d(data)
+            for channel, value in zip(channels, values):
+                channel_values[channel] = float(value)
+            return len(values)
+
+        samples = data.reshape(len(channels), -1) if data.ndim > 1 or len(channels) > 1 else data[np.newaxis]
+        n = samples.shape[1]
+        time.sleep(samples.nbytes / WRITE_BANDWIDTH)
+        if self._streaming():
+            if not self.out_stream.output_buf_size:
+                self.out_stream.output_buf_size = max(n, self.timing.samp_quant_samp_per_chan)
+            self._check_underflow()
+            if n > self.out_stream.space_avail:
+                raise DaqError("Write exceeds the space available in the buffer.", error_code=-200292)
+            self._written += n
+        else:
+            self._samples = samples
+            self.out_stream.output_buf_size = max(self.out_stream.output_buf_size, n)
+        for channel, row in zip(channels, samples):
+            channel_values[channel] = float(row[-1])
+        if auto_start and not self._running:
+            self.start()
+        return n
+
+    def read(self, number_of_samples_per_channel=None, timeout=10.0):
+        time.sleep(WRITE_LATENCY)
+        # Edge counting on a trigger line
+        if self.ci_channels and self._running:
+            return int((time.perf_counter() - self._started_at) * TRIGGER_RATE)
+        return 0
+
+    def start(self):
+        time.sleep(START_LATENCY)
+        self._running = True
+        self._started_at = time.perf_counter()
+        self._stopped_at = None
+        for channel in self.co_channels:
+            _counter_outputs[f"{channel.split('/')[0]}/{channel.split('/')[-1].capitalize()}InternalOutput"] = self
+
+    # A stopped counter stays registered so tasks it clocked stop where it did
+    def stop(self):
+        time.sleep(STOP_LATENCY)
+        underflow = self._running and self._consumed_all()
+        self._generated_before = self._generated()
+        self._running = False
+        self._stopped_at = time.perf_counter()
+        if underflow:
+            raise DaqError("Attempted to write samples that have already been generated "
+                           "(buffer underflow).", error_code=-200290)
+
+    def is_task_done(self):
+        if not self._running or self.timing.samp_quant_samp_mode != AcquisitionType.FINITE:
+            return not self._running
+        duration = self.timing.samp_quant_samp_per_chan / self.timing.samp_clk_rate
+        return time.perf_counter() - self._started_at >= duration
+
+    def wait_until_done(self, timeout=10.0):
+        if not self._running or self.timing.samp_clk_rate is None:
+            return
+        if self.timing.samp_quant_samp_mode != AcquisitionType.FINITE:
+            time.sleep(timeout)
+            raise DaqError("Wait until done timed out.", error_code=-200560)
+        duration = self.timing.samp_quant_samp_per_chan / self.timing.samp_clk_rate
+        remaining = duration - (time.perf_counter() - self._started_at)
+        if remaining > timeout:
+            time.sleep(timeout)
+            raise DaqError("Wait until done timed out.", error_code=-200560)
+        time.sleep(max(0.0, remaining))
+
+    def close(self):
+        if self._running:
+            self.stop()
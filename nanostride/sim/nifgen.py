@@ -0,0 +1,226 @@
+import time
+import threading
+from enum import Enum
+import numpy as np
+
+# In-process stand-in for an NI PXI-5441 AWG driven through nifgen.
+# Models onboard memory, bus write bandwidth and the streaming buffer, whose
+# free space grows as generation consumes samples at arb_sample_rate.
+ONBOARD_MEMORY_BYTES = 256 * 1024 * 1024
+BYTES_PER_SAMPLE = 2
+WRITE_BANDWIDTH = 400e6          # bytes/s over PXI
+SESSION_OPEN_LATENCY = 0.05      # s
+MIN_WAVEFORM_SIZE = 16
+WAVEFORM_QUANTUM = 4
+
+
+class Error(Exception):
+    pass
+
+class OutputMode(Enum):
+    FUNC = 0
+    ARB = 1
+    SEQ = 2
+    SCRIPT = 3
+
+class StartTriggerType(Enum):
+    NONE = 0
+    DIGITAL_EDGE = 1
+    SOFTWARE_EDGE = 2
+
+class StartTriggerDigitalEdgeEdge(Enum):
+    RISING = 0
+    FALLING = 1
+
+class TriggerMode(Enum):
+    SINGLE = 0
+    CONTINUOUS = 1
+    STEPPED = 2
+    BURST = 3
+
+class Waveform(Enum):
+    SINE = 0
+    SQUARE = 1
+    TRIANGLE = 2
+    RAMP_UP = 3
+    RAMP_DOWN = 4
+    DC = 5
+    NOISE = 6
+
+
+class _Generation:
+    def __init__(self, session):
+        self._session = session
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._session.abort()
+
+
+class Session:
+    def __init__(self, resource_name, options=None, reset_device=False):
+        time.sleep(SESSION_OPEN_LATENCY)
+        self.resource_name = resource_name
+        self.output_mode = OutputMode.FUNC
+        self.arb_sample_rate = 100e6
+        self.start_trigger_type = StartTriggerType.NONE
+        self.digital_edge_start_trigger_source = ""
+        self.digital_edge_start_trigger_edge = StartTriggerDigitalEdgeEdge.RISING
+        self.trigger_mode = TriggerMode.CONTINUOUS
+        self.output_enabled = True
+        self.min_waveform_size = MIN_WAVEFORM_SIZE
+        self.waveform_quantum = WAVEFORM_QUANTUM
+        self.max_waveform_size = ONBOARD_MEMORY_BYTES // BYTES_PER_SAMPLE
+        self._waveforms = {}
+        self._names = {}
+        self._sequences = {}
+        self._next_handle = 1
+        self._lock = threading.Lock()
+        self._streaming_handle = None
+        self._written = 0
+        self._started_at = None
+        self._consumed_before = 0
+        self._starved = False
+        self.underflows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.abort()
+
+    # Memory
+    def _used_samples(self):
+        return sum(len(w["data"]) for w in self._waveforms.values())
+
+    def _allocate(self, num_samples):
+        if num_samples < self.min_waveform_size or num_samples % self.waveform_quantum:
+            raise Error(f"Waveform size {num_samples} violates minimum {self.min_waveform_size} "
+                        f"/ quantum {self.waveform_quantum}.")
+        if self._used_samples() + num_samples > self.max_waveform_size:
+            raise Error("Not enough onboard memory for this waveform.")
+        handle = self._next_handle
+        self._next_handle += 1
+        self._waveforms[handle] = {"data": np.zeros(num_samples, dtype=np.float32)}
+        return handle
+
+    def allocate_waveform(self, num_samples):
+        return self._allocate(num_samples)
+
+    def allocate_named_waveform(self, waveform_name, num_samples):
+        self._names[waveform_name] = self._allocate(num_samples)
+
+    def _resolve(self, waveform):
+        return self._names[waveform] if isinstance(waveform, str) else waveform
+
+    def create_waveform(self, waveform_data):
+        data = np.asarray(waveform_data, dtype=np.float32)
+        handle = self._allocate(len(data))
+        self._waveforms[handle]["data"][:] = data
+        return handle
+
+    _create_waveform_f64_numpy = create_waveform
+
+    def create_arb_sequence(self, waveform_handles_array, loop_counts_array):
+        if len(waveform_handles_array) != len(loop_counts_array):
+            raise Error("Handle and loop count arrays differ in length.")
+        handle = self._next_handle
+        self._next_handle += 1
+        self._sequences[handle] = (list(waveform_handles_array), list(loop_counts_array))
+        return handle
+
+    def configure_arb_sequence(self, sequence_handle, gain, offset):
+        pass
+
+    def configure_arb_waveform(self, waveform_handle, gain, offset):
+        pass
+
+    def configure_standard_waveform(self, waveform, amplitude, frequency, dc_offset=0.0, start_phase=0.0):
+        pass
+
+    def write_script(self, script):
+        self.script = script
+
+    def clear_arb_memory(self):
+        self._waveforms.clear()
+        self._names.clear()
+        self._sequences.clear()
+
+    # Streaming
+    @property
+    def streaming_waveform_handle(self):
+        return self._streaming_handle
+
+    @streaming_waveform_handle.setter
+    def streaming_waveform_handle(self, handle):
+        self._streaming_handle = handle
+        self._written = 0
+        self._starved = False
+
+    def _consumed(self):
+        if self._started_at is None:
+            return self._consumed_before
+        elapsed = time.perf_counter() - self._started_at
+        return self._consumed_before + int(elapsed * self.arb_sample_rate)
+
+    @property
+    def streaming_space_available_in_waveform(self):
+        if self._streaming_handle is None:
+            raise Error("No streaming waveform configured.")
+        size = len(self._waveforms[self._streaming_handle]["data"])
+        consumed = self._consumed()
+        if consumed > self._written:
+            # Generation caught up with the data and replays stale samples;
+            # it only counts as an underflow if more data was still to come
+            self._starved = True
+            self._consumed_before = self._written
+            self._started_at = time.perf_counter()
+            consumed = self._written
+        return size - (self._written - consumed)
+
+    def write_waveform(self, waveform_name_or_handle, data):
+        handle = self._resolve(waveform_name_or_handle)
+        data = np.asarray(data)
+        waveform = self._waveforms[handle]
+        time.sleep(len(data) * BYTES_PER_SAMPLE / WRITE_BANDWIDTH)
+        with self._lock:
+            if handle == self._streaming_handle:
+                space = self.streaming_space_available_in_waveform
+                if self._starved:
+                    self.underflows += 1
+                    self._starved = False
+                if len(data) > space:
+                    raise Error("Write exceeds streaming space available.")
+                buffer = waveform["data"]
+                pos = self._written % len(buffer)
+                end = min(pos + len(data), len(buffer))
+                buffer[pos:end] = data[:end - pos]
+                buffer[:len(data) - (end - pos)] = data[end - pos:]
+                self._written += len(data)
+            else:
+                if len(data) > len(waveform["data"]):
+                    raise Error("Data is larger than the allocated waveform.")
+                waveform["data"][:len(data)] = data
+
+    # Generation
+    def initiate(self):
+        self._started_at = time.perf_counter()
+        self._consumed_before = 0
+        return _Generation(self)
+
+    def abort(self):
+        self._started_at = None
+
+    def wait_until_done(self, max_time=10.0):
+        if self._streaming_handle is not None:
+            return
+        total = sum(len(w["data"]) for w in self._waveforms.values())
+        time.sleep(min(max_time, total / self.arb_sample_rate))
+
+    def commit(self):
+        pass
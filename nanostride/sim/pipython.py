@@ -0,0 +1,121 @@
+import time
+
+# In-process stand-in for a PI C-887 hexapod controller driven through pipython.
+# Every GCS command costs one RS-232 round trip, whatever it carries, so
+# several axes in one MOV are as cheap as one. Moves run at a fixed velocity.
+COMMAND_LATENCY = 0.015          # s per GCS command over RS-232
+CONNECT_LATENCY = 0.1
+AXES = ("X", "Y", "Z", "U", "V", "W")
+VELOCITY = 5.0                   # mm/s (deg/s for U, V, W)
+TRAVEL = {"X": 50.0, "Y": 50.0, "Z": 25.0, "U": 15.0, "V": 15.0, "W": 30.0}
+
+
+class GCSError(Exception):
+    def __init__(self, value, message=""):
+        super().__init__(message or f"GCS error {value}")
+        self.val = value
+
+
+def _pairs(axes, values=None):
+    # pipython accepts MOV("X", 1), MOV(["X", "Y"], [1, 2]) and MOV({"X": 1, "Y": 2})
+    if isinstance(axes, dict):
+        return {str(a): float(v) for a, v in axes.items()}
+    if isinstance(axes, str):
+        axes = axes.split()
+        values = [values] if not isinstance(values, (list, tuple)) else values
+    return {str(a): float(v) for a, v in zip(axes, values)}
+
+
+class GCSDevice:
+    def __init__(self, devname="", gcsdll=""):
+        self.devname = devname
+        self.connected = False
+        self.commands = 0
+        self._start = dict.fromkeys(AXES, 0.0)
+        self._target = dict.fromkeys(AXES, 0.0)
+        self._move_started = time.perf_counter()
+        self._move_duration = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.CloseConnection()
+
+    def _command(self):
+        if not self.connected:
+            raise GCSError(-7, "Controller not connected.")
+        time.sleep(COMMAND_LATENCY)
+        self.commands += 1
+
+    def _position(self, axis):
+        if self._move_duration <= 0:
+            return self._target[axis]
+        progress = min(1.0, (time.perf_counter() - self._move_started) / self._move_duration)
+        return self._start[axis] + progress * (self._target[axis] - self._start[axis])
+
+    def _move(self, targets):
+        for axis, value in targets.items():
+            if axis not in AXES:
+                raise GCSError(15, f"Invalid axis identifier {axis}.")
+            if abs(value) > TRAVEL[axis]:
+                raise GCSError(7, f"Position out of limits for axis {axis}.")
+        # Axes not named keep heading for their existing targets
+        current = {a: self._position(a) for a in AXES}
+        self._start = current
+        self._target = dict(self._target)
+        self._target.update(targets)
+        distance = max(abs(self._target[a] - current[a]) for a in AXES)
+        self._move_started = time.perf_counter()
+        self._move_duration = distance / VELOCITY
+
+    def ConnectRS232(self, comport, baudrate=115200):
+        time.sleep(CONNECT_LATENCY)
+        self.connected = True
+
+    def ConnectTCPIP(self, ipaddress, ipport=50000):
+        self.ConnectRS232(ipaddress, ipport)
+
+    def CloseConnection(self):
+        self.connected = False
+
+    @property
+    def axes(self):
+        return list(AXES)
+
+    def MOV(self, axes, values=None):
+        self._command()
+        self._move(_pairs(axes, values))
+
+    def MVR(self, axes, values=None):
+        self._command()
+        relative = _pairs(axes, values)
+        self._move({a: self._target[a] + v for a, v in relative.items()})
+
+    def qPOS(self, axes=None):
+        self._command()
+        axes = AXES if axes is None else ([axes] if isinstance(axes, str) else axes)
+        return {a: self._position(a) for a in axes}
+
+    def qMOV(self, axes=None):
+        self._command()
+        axes = AXES if axes is None else ([axes] if isinstance(axes, str) else axes)
+        return {a: self._target[a] for a in axes}
+
+    def IsMoving(self, axes=None):
+        self._command()
+        axes = AXES if axes is None else ([axes] if isinstance(axes, str) else axes)
+        moving = time.perf_counter() - self._move_started < self._move_duration
+        return {a: moving and self._target[a] != self._start[a] for a in axes}
+
+    def qONT(self, axes=None):
+        return {a: not m for a, m in self.IsMoving(axes).items()}
+
+    def STP(self, noraise=False):
+        self._command()
+        self._target = {a: self._position(a) for a in AXES}
+        self._start = dict(self._target)
+        self._move_duration = 0.0
+
+# pipython exposes the GCS 2 syntax under this name as well
+GCS2Device = GCSDevice
@@ -0,0 +1,327 @@
+import time
+import threading
+from enum import IntFlag
+
+# In-process stand-in for an ACS SPiiPlus controller driven through SPiiPlusPython.
+# Every call costs one serial round trip; moves run at the commanded velocity
+# so feedback positions interpolate between the start and target points.
+COMMAND_LATENCY = 0.002          # s per serial round trip
+HOME_DURATION = 0.2
+NUM_AXES = 8
+SEQUENCE_QUEUE_DEPTH = 50        # vertices a multi-point or spline motion holds ahead of the axes
+
+SYNCHRONOUS = -1
+
+
+class MotionFlags(IntFlag):
+    ACSC_NONE = 0
+    ACSC_AMF_WAIT = 0x00000001
+    ACSC_AMF_RELATIVE = 0x00000002
+    ACSC_AMF_VELOCITY = 0x00000004
+    ACSC_AMF_ENDVELOCITY = 0x00000008
+    ACSC_AMF_CYCLIC = 0x00000100
+    ACSC_AMF_VARTIME = 0x00000200
+    ACSC_AMF_CUBIC = 0x00000400
+
+
+class Axis:
+    ACSC_AXIS_0 = 0
+    ACSC_AXIS_1 = 1
+    ACSC_AXIS_2 = 2
+    ACSC_NONE = -1
+
+
+class AcsError(Exception):
+    pass
+
+
+class _Controller:
+    def __init__(self):
+        self.target = [0.0] * NUM_AXES
+        self.start = [0.0] * NUM_AXES
+        self.enabled = [False] * NUM_AXES
+        self.velocity = 10.0
+        self.move_started = time.perf_counter()
+        self.move_duration = 0.0
+        # Queued (point, duration) segments of an open multi-point motion
+        self.segments = None
+        self.segment_axes = None
+        self.segment_period = None
+        self.segment_wait = False
+        self.segment_position = None
+        self.sequence_origin = None
+        self.sequence_started = None
+        self.sequence_end = None
+        self.segment_ends = None
+        self.pending = None
+        self.starvations = 0
+        self.commands = 0
+
+_controllers = {}
+_next_handle = [1]
+_lock = threading.Lock()
+
+
+def _controller(hc):
+    time.sleep(COMMAND_LATENCY)
+    try:
+        controller = _controllers[hc]
+    except KeyError:
+        raise AcsError(f"Invalid communication handle {hc}.")
+    controller.commands += 1
+    return controller
+
+def _axes(axes):
+    return [a for a in axes if a != -1]
+
+def _feedback(controller, axis):
+    if controller.move_duration <= 0:
+        return controller.target[axis]
+    progress = min(1.0, (time.perf_counter() - controller.move_started) / controller.move_duration)
+    return controller.start[axis] + progress * (controller.target[axis] - controller.start[axis])
+
+def _begin_move(controller, axes, points, velocity):
+    current = [_feedback(controller, a) for a in range(NUM_AXES)]
+    controller.start = current
+    controller.target = list(current)
+    for axis, point in zip(axes, points):
+        controller.target[axis] = float(point)
+    distance = max((abs(controller.target[a] - current[a]) for a in axes), default=0.0)
+    controller.velocity = velocity or controller.velocity
+    controller.move_started = time.perf_counter()
+    controller.move_duration = distance / controller.velocity if controller.velocity else 0.0
+
+
+# Communication
+def OpenCommSerial(channel, rate=115200):
+    time.sleep(COMMAND_LATENCY)
+    with _lock:
+        hc = _next_handle[0]
+        _next_handle[0] += 1
+        _controllers[hc] = _Controller()
+    return hc
+
+def OpenCommEthernetTCP(address="10.0.0.100", port=701):
+    return OpenCommSerial(address, port)
+
+def CloseComm(hc):
+    _controller(hc)
+    del _controllers[hc]
+
+
+# Buffers and enable state
+def RunBuffer(hc, buffer, label=None, wait=SYNCHRONOUS, failure_check=True):
+    controller = _controller(hc)
+    if label == "STARTUP":
+        _begin_move(controller, list(range(NUM_AXES)), [0.0] * NUM_AXES, None)
+        controller.enabled = [True] * NUM_AXES
+        time.sleep(HOME_DURATION)
+
+def Enable(hc, axis, wait=SYNCHRONOUS, failure_check=True):
+    _controller(hc).enabled[axis] = True
+
+def EnableM(hc, axes, wait=SYNCHRONOUS, failure_check=True):
+    controller = _controller(hc)
+    for axis in _axes(axes):
+        controller.enabled[axis] = True
+
+def DisableAll(hc, wait=SYNCHRONOUS, failure_check=True):
+    controller = _controller(hc)
+    controller.enabled = [False] * NUM_AXES
+
+
+# Positions
+def GetTargetPosition(hc, axis, wait=SYNCHRONOUS, failure_check=True):
+    return _controller(hc).target[axis]
+
+def GetFPosition(hc, axis, wait=SYNCHRONOUS, failure_check=True):
+    return _feedback(_controller(hc), axis)
+
+def GetRPosition(hc, axis, wait=SYNCHRONOUS, failure_check=True):
+    return _feedback(_controller(hc), axis)
+
+
+# Point to point
+def ToPoint(hc, flags, axis, point, wait=SYNCHRONOUS, failure_check=True):
+    controller = _controller(hc)
+    if flags & MotionFlags.ACSC_AMF_RELATIVE:
+        point += controller.target[axis]
+    _begin_move(controller, [axis], [point], None)
+
+def ToPointM(hc, flags, axes, point, wait=SYNCHRONOUS, failure_check=True):
+    ExtToPointM(hc, flags, axes, point, failure_check=failure_check)
+
+def ExtToPoint(hc, flags, axis, point, velocity=None, endVelocity=0, wait=SYNCHRONOUS, failure_check=True):
+    ExtToPointM(hc, flags, [axis, -1], [point], velocity, endVelocity, wait, failure_check)
+
+def ExtToPointM(hc, flags, axes, point, velocity=None, endVelocity=0, wait=SYNCHRONOUS, failure_check=True):
+    controller = _controller(hc)
+    axes = _axes(axes)
+    if flags & MotionFlags.ACSC_AMF_RELATIVE:
+        point = [p + controller.target[a] for a, p in zip(axes, point)]
+    if not flags & MotionFlags.ACSC_AMF_VELOCITY:
+        velocity = None
+    _begin_move(controller, axes, point, velocity)
+
+
+# Multi-point and spline motion: MultiPointM or SplineM opens the path and
+# each AddPointM / AddPVPointM call queues one vertex; the path runs as one
+# continuous motion. Spline vertices take the SplineM period, or their own time
+# interval with ACSC_AMF_VARTIME. Without ACSC_AMF_WAIT the motion starts with
+# the first vertex and plays while the rest are still arriving over the link:
+# a vertex that arrives after the motion has used up the ones before it has
+# starved the path (counted in starvations). With ACSC_AMF_WAIT nothing moves
+# until GoM, given either after EndSequenceM closed the path or while it is
+# still open, with the remaining vertices following during the motion. The
+# controller holds at most SEQUENCE_QUEUE_DEPTH vertices that have not run yet;
+# queueing one more fails.
+def _open_sequence(hc, flags, axes, period=None):
+    controller = _controller(hc)
+    controller.segment_axes = _axes(axes)
+    controller.segment_period = period
+    controller.segment_wait = bool(flags & MotionFlags.ACSC_AMF_WAIT)
+    controller.sequence_origin = [_feedback(controller, a) for a in range(NUM_AXES)]
+    controller.segment_position = [controller.sequence_origin[a] for a in controller.segment_axes]
+    controller.segments = []
+    controller.sequence_started = None
+    controller.sequence_end = None
+    controller.segment_ends = []
+
+def _queue(hc, point, velocity=None, interval=None):
+    controller = _controller(hc)
+    if controller.segments is None:
+        raise AcsError("No multi-point or spline motion is open.")
+    if interval is None and controller.segment_period is not None:
+        interval = controller.segment_period
+    if interval is not None:
+        duration = interval / 1000
+    else:
+        distance = max(abs(p - q) for p, q in zip(point, controller.segment_position))
+        duration = distance / (velocity or controller.velocity)
+    now = time.perf_counter()
+    if controller.sequence_started is None:
+        queued = len(controller.segments)
+    else:
+        queued = sum(end > now for end in controller.segment_ends[-SEQUENCE_QUEUE_DEPTH:])
+    if queued >= SEQUENCE_QUEUE_DEPTH:
+        raise AcsError(f"Motion queue full, {SEQUENCE_QUEUE_DEPTH} vertices are waiting.")
+    controller.segment_position = list(point)
+    controller.segments.append((list(point), duration))
+    if controller.sequence_started is None:
+        if controller.segment_wait:
+            return
+        controller.sequence_started = now
+        controller.sequence_end = now
+    elif now > controller.sequence_end:
+        controller.starvations += 1
+        controller.sequence_end = now
+    controller.sequence_end += duration
+    controller.segment_ends.append(controller.sequence_end)
+    _present_sequence(controller)
+
+# Present the path as one move from where it began to its last queued vertex
+def _present_sequence(controller):
+    controller.start = list(controller.sequence_origin)
+    controller.target = list(controller.sequence_origin)
+    for axis, point in zip(controller.segment_axes, controller.segments[-1][0]):
+        controller.target[axis] = float(point)
+    controller.move_started = controller.sequence_started
+    controller.move_duration = controller.sequence_end - controller.sequence_started
+
+def MultiPointM(hc, flags, axes, dwell=0.0, wait=SYNCHRONOUS, failure_check=True):
+    _open_sequence(hc, flags, axes)
+
+def MultiPoint(hc, flags, axis, dwell=0.0, wait=SYNCHRONOUS, failure_check=True):
+    _open_sequence(hc, flags, [axis])
+
+def ExtAddPointM(hc, axes, point, velocity, wait=SYNCHRONOUS, failure_check=True):
+    _queue(hc, point, velocity)
+
+def ExtAddPoint(hc, axis, point, velocity, wait=SYNCHRONOUS, failure_check=True):
+    _queue(hc, [point], velocity)
+
+def AddPointM(hc, axes, point, wait=SYNCHRONOUS, failure_check=True):
+    _queue(hc, point)
+
+def SplineM(hc, flags, axes, period, wait=SYNCHRONOUS, failure_check=True):
+    _open_sequence(hc, flags, axes, period)
+
+def Spline(hc, flags, axis, period, wait=SYNCHRONOUS, failure_check=True):
+    _open_sequence(hc, flags, [axis], period)
+
+def AddPVPointM(hc, axes, point, velocity, wait=SYNCHRONOUS, failure_check=True):
+    _queue(hc, point)
+
+def AddPVPoint(hc, axis, point, velocity, wait=SYNCHRONOUS, failure_check=True):
+    _queue(hc, [point])
+
+def AddPVTPointM(hc, axes, point, velocity, timeInterval, wait=SYNCHRONOUS, failure_check=True):
+    _queue(hc, point, interval=timeInterval)
+
+def AddPVTPoint(hc, axis, point, velocity, timeInterval, wait=SYNCHRONOUS, failure_check=True):
+    _queue(hc, [point], interval=timeInterval)
+
+def EndSequenceM(hc, axes, wait=SYNCHRONOUS, failure_check=True):
+    controller = _controller(hc)
+    if controller.segments is None:
+        raise AcsError("No multi-point or spline motion is open.")
+    if controller.segment_wait and controller.sequence_started is None:
+        # Closed and held for GoM
+        controller.pending = (controller.segment_axes, controller.segments)
+    controller.segments = None
+
+def EndSequence(hc, axis, wait=SYNCHRONOUS, failure_check=True):
+    EndSequenceM(hc, [axis], wait, failure_check)
+
+# Start motions that were opened with ACSC_AMF_WAIT, closed or still open
+def GoM(hc, axes, wait=SYNCHRONOUS, failure_check=True):
+    controller = _controller(hc)
+    closed = controller.pending is not None
+    if closed:
+        controller.segment_axes, controller.segments = controller.pending
+        controller.pending = None
+    elif controller.segments is None or not controller.segment_wait or controller.sequence_started is not None:
+        return
+    controller.sequence_origin = [_feedback(controller, a) for a in range(NUM_AXES)]
+    controller.sequence_started = time.perf_counter()
+    controller.sequence_end = controller.sequence_started
+    controller.segment_ends = []
+    for _, duration in controller.segments:
+        controller.sequence_end += duration
+        controller.segment_ends.append(controller.sequence_end)
+    if controller.segments:
+        _present_sequence(controller)
+    if closed:
+        controller.segments = None
+
+def Go(hc, axis, wait=SYNCHRONOUS, failure_check=True):
+    GoM(hc, [axis], wait, failure_check)
+
+
+def GetMotorState(hc, axis, wait=SYNCHRONOUS, failure_check=True):
+    controller = _controller(hc)
+    moving = time.perf_counter() - controller.move_started < controller.move_duration
+    return {"enabled": controller.enabled[axis], "moving": moving}
+
+def WaitMotionEnd(hc, axis, timeout=60000):
+    WaitLogicalMotionEnd(hc, axis, timeout)
+
+def WaitLogicalMotionEnd(hc, axis, timeout=60000):
+    controller = _controller(hc)
+    remaining = controller.move_duration - (time.perf_counter() - controller.move_started)
+    if remaining * 1000 > timeout:
+        time.sleep(timeout / 1000)
+        raise AcsError("Timeout waiting for motion end.")
+    time.sleep(max(0.0, remaining))
+
+def Halt(hc, axis, wait=SYNCHRONOUS, failure_check=True):
+    controller = _controller(hc)
+    position = _feedback(controller, axis)
+    controller.target[axis] = position
+    controller.start[axis] = position
+
+def KillAll(hc, wait=SYNCHRONOUS, failure_check=True):
+    controller = _controller(hc)
+    controller.target = [_feedback(controller, a) for a in range(NUM_AXES)]
+    controller.start = list(controller.target)
+    controller.move_duration = 0.0
@@ -2,47 +2,277 @@ import os
 import subprocess
 import zipfile
 import shutil
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+try:
+    from .stack_utils import list_sl1_layers
+except ImportError:
+    from stack_utils import list_sl1_layers
 
-def slice_and_extract(slicer_path, stl_path, config_path, output_dir, extracted_image_dir):
+# Slice cache: one directory of PNGs per hash of (slicer, STL, config, CLI options)
+SLICE_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".nanostride", "slice_cache")
+SLICE_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+SLICE_KEY_FILE = ".slice_key"
+
+def slice_cache_key(slicer_path, stl_path, config_path, center="500,500", layer_height=1):
+    h = hashlib.sha256()
+    for path in (stl_path, config_path):
+        h.update(str(os.path.getsize(path)).encode() + b"\0")
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(block)
+    # A different slicer build can produce different layers
+    slicer_stat = os.stat(slicer_path)
+    h.update(f"{os.path.basename(slicer_path)}:{slicer_stat.st_size}:{slicer_stat.st_mtime_ns}".encode())
+    h.update(f"center={center};layer_height={layer_height}".encode())
+    return h.hexdigest()
+
+def _read_slice_key(image_dir):
+    try:
+        with open(os.path.join(image_dir, SLICE_KEY_FILE)) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def _link_or_copy(src, dst):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+def _copy_pngs(src_dir, dst_dir):
+    for file in os.listdir(src_dir):
+        if file.endswith(".png"):
+            _link_or_copy(os.path.join(src_dir, file), os.path.join(dst_dir, file))
+
+def _dir_size(path):
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+def _store_in_cache(image_dir, cache_dir, key):
+    entry = os.path.join(cache_dir, key)
+    if os.path.isdir(entry):
+        return
+    staging = entry + ".tmp"
+    if os.path.exists(staging):
+        shutil.rmtree(staging)
+    os.makedirs(staging)
+    _copy_pngs(image_dir, staging)
+    os.replace(staging, entry)
+
+# Drop least recently used entries until the cache fits, never the one in use
+def evict_slice_cache(cache_dir=SLICE_CACHE_DIR, max_bytes=SLICE_CACHE_MAX_BYTES, keep=None):
+    if not os.path.isdir(cache_dir):
+        return
+    entries = [e for e in os.scandir(cache_dir) if e.is_dir() and not e.name.endswith(".tmp")]
+    sizes = {e.path: _dir_size(e.path) for e in entries}
+    total = sum(sizes.values())
+    for e in sorted(entries, key=lambda e: e.stat().st_mtime):
+        if total <= max_bytes:
+            break
+        if e.name == keep:
+            continue
+        shutil.rmtree(e.path)
+        total -= sizes[e.path]
+
+# Remove one cached stack (by key) or the whole cache
+def invalidate_slice_cache(key=None, cache_dir=SLICE_CACHE_DIR):
+    if key is None:
+        if os.path.isdir(cache_dir):
+            shutil.rmtree(cache_dir)
+        return
+    entry = os.path.join(cache_dir, key)
+    if os.path.isdir(entry):
+        shutil.rmtree(entry)
+
+# Run PrusaSlicer and return the path of the .sl1 archive it wrote.
+# Open it with stack_utils.SL1Archive to read layers without extracting.
+# center=None with dont_arrange=True keeps the STL's own XY coordinates.
+def slice_sla(slicer_path, stl_path, config_path, output_dir, center="500,500", layer_height=1,
+              dont_arrange=False):
     os.makedirs(output_dir, exist_ok=True)
-    
+
     basename = os.path.splitext(os.path.basename(stl_path))[0]
     sl1_file = os.path.join(output_dir, f"{basename}.sl1")
-    zip_file = os.path.join(output_dir, f"{basename}.zip")
 
-    cmd = [
-        slicer_path,
-        "--load", config_path,
-        "--center", "500,500",
+    cmd = [slicer_path, "--load", config_path]
+    if center is not None:
+        cmd += ["--center", center]
+    if dont_arrange:
+        cmd += ["--dont-arrange"]
+    cmd += [
         "--export-sla",
         stl_path,
         "--output", output_dir,
-        "--layer-height", "1"
+        "--layer-height", str(layer_height)
     ]
 
     result = subprocess.run(cmd, capture_output=True, text=True)
 
     if result.returncode != 0:
         raise RuntimeError(f"Slicing failed:\n{result.stderr}")
-    
-    os.rename(sl1_file, zip_file)
+    return sl1_file
+
+def slice_and_extract(slicer_path, stl_path, config_path, output_dir, extracted_image_dir,
+                      center="500,500", layer_height=1,
+                      cache_dir=SLICE_CACHE_DIR, max_cache_bytes=SLICE_CACHE_MAX_BYTES):
+    key = None
+    if cache_dir is not None:
+        key = slice_cache_key(slicer_path, stl_path, config_path, center, layer_height)
+        entry = os.path.join(cache_dir, key)
+        if os.path.isdir(entry):
+            os.utime(entry)
+            # Image dir already holds this stack, leave it alone
+            if _read_slice_key(extracted_image_dir) == key:
+                return extracted_image_dir
+            if os.path.exists(extracted_image_dir):
+                shutil.rmtree(extracted_image_dir)
+            os.makedirs(extracted_image_dir)
+            _copy_pngs(entry, extracted_image_dir)
+            with open(os.path.join(extracted_image_dir, SLICE_KEY_FILE), "w") as f:
+                f.write(key)
+            return extracted_image_dir
+
+    sl1_file = slice_sla(slicer_path, stl_path, config_path, output_dir, center, layer_height)
+
+    if os.path.exists(extracted_image_dir):
+        shutil.rmtree(extracted_image_dir)
+    os.makedirs(extracted_image_dir)
+
+    # Write the PNG members straight into the image dir, no rename or temp dir
+    with zipfile.ZipFile(sl1_file, 'r') as zip_ref:
+        png_files = list_sl1_layers(zip_ref)
+        if not png_files:
+            raise FileNotFoundError("No PNG slice images found.")
+        for file in png_files:
+            with zip_ref.open(file) as src, open(os.path.join(extracted_image_dir, os.path.basename(file)), "wb") as dst:
+                shutil.copyfileobj(src, dst)
+
+    os.remove(sl1_file)
 
-    extract_temp = os.path.join(output_dir, "temp_extract")
-    os.makedirs(extract_temp, exist_ok=True)
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        _store_in_cache(extracted_image_dir, cache_dir, key)
+        evict_slice_cache(cache_dir, max_cache_bytes, keep=key)
+        with open(os.path.join(extracted_image_dir, SLICE_KEY_FILE), "w") as f:
+            f.write(key)
+    return extracted_image_dir
+
+
+# Parallel Z-band slicing
+# The part is centred once, then cut into bands whose boundaries fall on
+# layer boundaries. Each band is sliced by its own slicer process with
+# --dont-arrange so XY placement is shared, and the layers are renumbered
+# into one stack.
+
+# Keep the part of each triangle on the side sign * (z - z0) >= 0
+def _clip_triangles(vectors, z0, sign):
+    import numpy as np
+
+    inside = sign * (vectors[:, :, 2] - z0) >= 0
+    count = inside.sum(axis=1)
+    kept = [vectors[count == 3]]
+
+    def crossing(a, b):
+        t = (z0 - a[:, 2]) / (b[:, 2] - a[:, 2])
+        return a + t[:, None] * (b - a)
+
+    def rotated(tris, first):
+        # Cyclic rotation keeps the winding (and so the normals) unchanged
+        order = (first[:, None] + np.arange(3)) % 3
+        return np.take_along_axis(tris, order[:, :, None], axis=1)
+
+    # One vertex inside: shrink to the corner triangle
+    one = count == 1
+    if one.any():
+        tris = rotated(vectors[one], np.argmax(inside[one], axis=1))
+        a, b, c = tris[:, 0], tris[:, 1], tris[:, 2]
+        kept.append(np.stack([a, crossing(a, b), crossing(a, c)], axis=1))
+
+    # Two vertices inside: the remaining quad as two triangles
+    two = count == 2
+    if two.any():
+        tris = rotated(vectors[two], (np.argmin(inside[two], axis=1) + 1) % 3)
+        a, b, c = tris[:, 0], tris[:, 1], tris[:, 2]
+        p_ca, p_cb = crossing(c, a), crossing(c, b)
+        kept.append(np.stack([a, b, p_cb], axis=1))
+        kept.append(np.stack([a, p_cb, p_ca], axis=1))
+
+    return np.concatenate(kept)
+
+def _write_stl(vectors, path):
+    import numpy as np
+    from stl import mesh
+
+    band = mesh.Mesh(np.zeros(len(vectors), dtype=mesh.Mesh.dtype))
+    band.vectors[:] = vectors
+    band.update_normals()
+    band.save(path)
+
+def _band_layer_counts(total_layers, bands):
+    base, extra = divmod(total_layers, bands)
+    return [base + (1 if i < extra else 0) for i in range(bands) if base or i < extra]
+
+def slice_and_extract_parallel(slicer_path, stl_path, config_path, output_dir, extracted_image_dir,
+                               bands=4, workers=None, center="500,500", layer_height=1):
+    import math
+    from stl import mesh
+
+    part = mesh.Mesh.from_file(stl_path)
+    vectors = part.vectors.astype(float)
+
+    # Centre in XY once so every band lands in the same place on the display
+    cx, cy = (float(v) for v in center.split(","))
+    lo, hi = vectors.reshape(-1, 3).min(axis=0), vectors.reshape(-1, 3).max(axis=0)
+    vectors[:, :, 0] += cx - (lo[0] + hi[0]) / 2
+    vectors[:, :, 1] += cy - (lo[1] + hi[1]) / 2
+
+    z_min, z_max = lo[2], hi[2]
+    # STL coordinates are float32, allow for their rounding
+    total_layers = math.ceil((z_max - z_min) / layer_height - 1e-4)
+    counts = _band_layer_counts(total_layers, bands)
+
+    basename = os.path.splitext(os.path.basename(stl_path))[0]
+    jobs = []
+    first_layer = 0
+    for i, count in enumerate(counts):
+        z0 = z_min + first_layer * layer_height
+        band = vectors
+        if i > 0:
+            band = _clip_triangles(band, z0, 1)
+        if i < len(counts) - 1:
+            band = _clip_triangles(band, z0 + count * layer_height, -1)
+        band_dir = os.path.join(output_dir, f"band_{i:03d}")
+        os.makedirs(band_dir, exist_ok=True)
+        band_stl = os.path.join(band_dir, f"{basename}.stl")
+        _write_stl(band, band_stl)
+        jobs.append((band_stl, band_dir, first_layer, count))
+        first_layer += count
 
-    with zipfile.ZipFile(zip_file, 'r') as zip_ref:
-        zip_ref.extractall(extract_temp)
+    def run(job):
+        band_stl, band_dir, _, _ = job
+        return slice_sla(slicer_path, band_stl, config_path, band_dir, center=None,
+                         layer_height=layer_height, dont_arrange=True)
 
-    png_files = [f for f in os.listdir(extract_temp) if f.endswith(".png")]
-    if not png_files:
-        raise FileNotFoundError("No PNG slice images found.")
+    with ThreadPoolExecutor(max_workers=workers or len(jobs)) as pool:
+        sl1_files = list(pool.map(run, jobs))
 
+    # Stitch, checking every band produced exactly its share of layers
     if os.path.exists(extracted_image_dir):
         shutil.rmtree(extracted_image_dir)
     os.makedirs(extracted_image_dir)
 
-    for file in png_files:
-        shutil.move(os.path.join(extract_temp, file), os.path.join(extracted_image_dir, file))
+    for (band_stl, band_dir, first_layer, count), sl1_file in zip(jobs, sl1_files):
+        with zipfile.ZipFile(sl1_file, 'r') as zip_ref:
+            png_files = list_sl1_layers(zip_ref)
+            if len(png_files) != count:
+                raise RuntimeError(
+                    f"Band starting at layer {first_layer} produced {len(png_files)} layers, "
+                    f"expected {count}: layers would be missing or duplicated at the band edges."
+                )
+            for j, file in enumerate(png_files):
+                target = os.path.join(extracted_image_dir, f"{basename}{first_layer + j:05d}.png")
+                with zip_ref.open(file) as src, open(target, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+        shutil.rmtree(band_dir)
 
-    shutil.rmtree(extract_temp)
-    os.remove(zip_file)
+    return extracted_image_dir
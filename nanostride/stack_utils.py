@@ -0,0 +1,244 @@
+import numpy as np
+from PIL import Image
+import os
+import io
+import zipfile
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+
+def list_slice_images(image_dir):
+    return sorted([
+        f for f in os.listdir(image_dir)
+        if f.endswith(".png")
+    ])
+
+# Layer images of an .sl1 archive: top-level PNG members only, so nested
+# ones such as thumbnail/thumbnail400x400.png are not taken for layers
+def list_sl1_layers(zip_file):
+    return sorted(n for n in zip_file.namelist() if n.endswith(".png") and "/" not in n)
+
+def slice_stack_shape(image_dir):
+    image_files = list_slice_images(image_dir)
+    if not image_files:
+        raise FileNotFoundError(f"No PNG slice images found in {image_dir}.")
+    # Only the header is read here, the pixels stay on disk
+    with Image.open(os.path.join(image_dir, image_files[0])) as img:
+        width, height = img.size
+    return len(image_files), height, width
+
+# Worker: decode one layer and threshold it straight into the shared stack.
+# layer_shape is the (height, width) every layer must have.
+def _decode_layer(args):
+    path, shm_name, shape, layer_shape, index, packbits = args
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        stack = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+        img = np.asarray(Image.open(path).convert("L"))
+        if img.shape != layer_shape:
+            raise ValueError(f"{path} is {img.shape}, expected {layer_shape} like the first layer")
+        if packbits:
+            stack[index] = np.packbits(img > 128, axis=-1)
+        else:
+            np.greater(img, 128, out=stack[index])
+        del stack
+    finally:
+        shm.close()
+
+# Parallel slice loading. Layers are decoded in a process pool and written
+# into one shared-memory block, so no pixel data is pickled between processes.
+# With packbits=True each row is stored 8 pixels per byte
+# (recover with np.unpackbits(stack, axis=-1, count=width)).
+def load_slice_stack_parallel(image_dir, workers=None, packbits=False):
+    n_layers, height, width = slice_stack_shape(image_dir)
+    paths = [os.path.join(image_dir, f) for f in list_slice_images(image_dir)]
+    shape = (n_layers, height, (width + 7) // 8 if packbits else width)
+    workers = workers or os.cpu_count() or 1
+
+    shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)))
+    try:
+        tasks = [(path, shm.name, shape, (height, width), i, packbits) for i, path in enumerate(paths)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, n_layers // (workers * 4))
+            for _ in pool.map(_decode_layer, tasks, chunksize=chunksize):
+                pass
+        stack = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+    return stack
+
+# PrusaSlicer .sl1 archives read in place: layers are decoded from the zip
+# members on access, nothing is extracted to disk
+class SL1Archive:
+    def __init__(self, path):
+        self.path = path
+        self._zip = zipfile.ZipFile(path)
+        self.layer_names = list_sl1_layers(self._zip)
+        if not self.layer_names:
+            self._zip.close()
+            raise FileNotFoundError(f"No PNG slice images found in {path}.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.layer_names)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return np.stack([self[i] for i in range(*index.indices(len(self)))])
+        return (self.read_gray(index) > 128).view(np.uint8)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def read_gray(self, index):
+        data = self._zip.read(self.layer_names[index])
+        return np.asarray(Image.open(io.BytesIO(data)).convert("L"))
+
+    @property
+    def shape(self):
+        with Image.open(io.BytesIO(self._zip.read(self.layer_names[0]))) as img:
+            width, height = img.size
+        return len(self), height, width
+
+    def load_stack(self):
+        stack = np.empty(self.shape, dtype=np.uint8)
+        for i in range(len(self)):
+            np.greater(self.read_gray(i), 128, out=stack[i])
+        return stack
+
+    def close(self):
+        self._zip.close()
+
+# Packed slice stack files (.nss): 64-byte header, a table of layer offsets,
+# then each layer stored with np.packbits (8 pixels per byte). The file is
+# memory-mapped, so any layer is read in O(1) without touching the others.
+STACK_MAGIC = b"NSSK"
+STACK_HEADER_FORMAT = "<4sHIIIIQ"  # magic, version, layers, height, width, row bytes, data offset
+STACK_HEADER_SIZE = 64
+
+def open_slice_source(source):
+    if source.endswith(".sl1"):
+        return SL1Archive(source)
+    if source.endswith(".nss"):
+        return PackedSliceStack(source)
+    return PNGSliceDirectory(source)
+
+class PNGSliceDirectory:
+    def __init__(self, image_dir):
+        self.image_dir = image_dir
+        self.layer_names = list_slice_images(image_dir)
+        if not self.layer_names:
+            raise FileNotFoundError(f"No PNG slice images found in {image_dir}.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.layer_names)
+
+    def __getitem__(self, index):
+        path = os.path.join(self.image_dir, self.layer_names[index])
+        return (np.asarray(Image.open(path).convert("L")) > 128).view(np.uint8)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def close(self):
+        pass
+
+# Import a PNG directory or .sl1 archive into one packed stack file. Written
+# to path + ".tmp" and moved into place only once every layer is in, so a
+# failed import never leaves a truncated file behind that reads as valid.
+def write_packed_stack(source, path):
+    with open_slice_source(source) as layers:
+        n_layers = len(layers)
+        first = layers[0]
+        height, width = first.shape
+        row_bytes = (width + 7) // 8
+        layer_bytes = height * row_bytes
+        index_end = STACK_HEADER_SIZE + 8 * n_layers
+        data_offset = -(-index_end // 64) * 64
+
+        staging = path + ".tmp"
+        try:
+            with open(staging, "wb") as f:
+                header = struct.pack(STACK_HEADER_FORMAT, STACK_MAGIC, 1, n_layers, height, width,
+                                     row_bytes, data_offset)
+                f.write(header.ljust(STACK_HEADER_SIZE, b"\0"))
+                offsets = data_offset + layer_bytes * np.arange(n_layers, dtype="<u8")
+                f.write(offsets.tobytes())
+                f.write(b"\0" * (data_offset - index_end))
+                for i in range(n_layers):
+                    layer = first if i == 0 else layers[i]
+                    if layer.shape != (height, width):
+                        raise ValueError(f"Layer {i} is {layer.shape}, expected {(height, width)}")
+                    f.write(np.packbits(layer, axis=-1).tobytes())
+            os.replace(staging, path)
+        except BaseException:
+            if os.path.exists(staging):
+                os.remove(staging)
+            raise
+    return path
+
+class PackedSliceStack:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            raw = f.read(STACK_HEADER_SIZE)
+        if len(raw) < STACK_HEADER_SIZE or raw[:4] != STACK_MAGIC:
+            raise ValueError(f"{path} is not a NanoStride slice stack file.")
+        _, self.version, n_layers, height, width, row_bytes, _ = struct.unpack_from(STACK_HEADER_FORMAT, raw)
+        self.shape = (n_layers, height, width)
+        self.offsets = np.memmap(path, dtype="<u8", mode="r", offset=STACK_HEADER_SIZE, shape=(n_layers,))
+        self._data = np.memmap(path, dtype=np.uint8, mode="r")
+        self._layer_shape = (height, row_bytes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.shape[0]
+
+    def packed(self, index):
+        start = int(self.offsets[index])
+        size = self._layer_shape[0] * self._layer_shape[1]
+        return self._data[start:start + size].reshape(self._layer_shape)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return np.stack([self[i] for i in range(*index.indices(len(self)))])
+        return np.unpackbits(self.packed(index), axis=-1, count=self.shape[2])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def load_stack(self):
+        stack = np.empty(self.shape, dtype=np.uint8)
+        for i in range(len(self)):
+            stack[i] = self[i]
+        return stack
+
+    # Write the layers back out as 0/255 PNGs named <basename>NNNNN.png
+    def export_png(self, image_dir, basename="layer"):
+        os.makedirs(image_dir, exist_ok=True)
+        for i in range(len(self)):
+            Image.fromarray(self[i] * np.uint8(255)).save(os.path.join(image_dir, f"{basename}{i:05d}.png"))
+
+    def close(self):
+        self.offsets = self._data = None
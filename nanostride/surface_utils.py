@@ -0,0 +1,147 @@
+import os
+import hashlib
+import numpy as np
+
+# Focus/tilt surface maps
+# Calibration gives hexapod poses (Z, U, V, ...) recorded at scattered stage
+# positions. Each axis is interpolated over X/Y with a thin-plate spline plus an
+# affine term, so three points already give a tilted plane and more points bend
+# it. Repeated X/Y positions are averaged into one sample. Fits are cached on
+# disk under the calibration's name (or a hash of the samples when unnamed),
+# together with the samples, so SurfaceMap.load brings a fitted map back
+# without the points or a refit. Evaluation handles a whole trajectory at once,
+# in blocks sized so one block's kernel matrix stays near SURFACE_EVAL_ELEMENTS.
+SURFACE_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".nanostride", "surface_cache")
+SURFACE_AXES = ("Z", "U", "V")
+SURFACE_EVAL_ELEMENTS = 1 << 22
+
+def _kernel(r):
+    # Thin-plate spline r^2 log r, zero at r = 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(r > 0, r * r * np.log(r), 0.0)
+
+def _affine(xy):
+    return np.column_stack([np.ones(len(xy)), xy])
+
+def surface_cache_key(xy, values, smoothing):
+    h = hashlib.sha256()
+    h.update(np.ascontiguousarray(xy, dtype=np.float64).tobytes())
+    h.update(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+    h.update(f"tps;smoothing={smoothing}".encode())
+    return h.hexdigest()
+
+# Mean value per distinct X/Y, so repeated measurements cannot make the
+# spline system singular
+def _merge_repeats(xy, values):
+    unique, inverse = np.unique(xy, axis=0, return_inverse=True)
+    if len(unique) == len(xy):
+        return xy, values
+    inverse = inverse.reshape(-1)
+    sums = np.zeros((len(unique), values.shape[1]))
+    np.add.at(sums, inverse, values)
+    return unique, sums / np.bincount(inverse)[:, None]
+
+class SurfaceMap:
+    def __init__(self, xy, poses, axes=SURFACE_AXES, smoothing=0.0, cache_dir=SURFACE_CACHE_DIR,
+                 eval_block=None, name=None):
+        xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+        self.axes = tuple(axes)
+        if isinstance(poses, np.ndarray):
+            values = poses.astype(np.float64).reshape(len(xy), len(self.axes))
+        else:
+            values = np.array([[pose[a] for a in self.axes] for pose in poses], dtype=np.float64)
+        if len(xy) == 0:
+            raise ValueError("A surface map needs at least one calibration point.")
+        self.xy, self.values = _merge_repeats(xy, values)
+        self.smoothing = smoothing
+        self.name = name
+        if eval_block is None:
+            eval_block = max(1, SURFACE_EVAL_ELEMENTS // len(self.xy))
+        self.eval_block = eval_block
+        # Work in coordinates centred on the samples, keeps the system well conditioned
+        self._origin = self.xy.mean(axis=0)
+        self._scale = max(float(np.abs(self.xy - self._origin).max()), 1e-9)
+        self.weights, self.coeffs = self._load_or_fit(cache_dir)
+
+    # From the notebook's {(x, y): {"X": ..., "Z": ..., ...}} contour map
+    @classmethod
+    def from_contour_map(cls, contour_map, axes=SURFACE_AXES, **kwargs):
+        return cls(list(contour_map.keys()), list(contour_map.values()), axes, **kwargs)
+
+    # A map fitted and cached earlier under name, without its points or a refit
+    @classmethod
+    def load(cls, name, cache_dir=SURFACE_CACHE_DIR, eval_block=None):
+        entry = os.path.join(cache_dir, f"{name}.npz")
+        if not os.path.exists(entry):
+            raise FileNotFoundError(f"No surface map named {name!r} in {cache_dir}.")
+        with np.load(entry) as cached:
+            return cls(cached["xy"], cached["values"], tuple(cached["axes"].tolist()),
+                       float(cached["smoothing"]), cache_dir, eval_block, name)
+
+    def _normalized(self, xy):
+        return (xy - self._origin) / self._scale
+
+    # A named entry holding different samples is an older calibration of the
+    # same name and is refitted and replaced
+    def _load_or_fit(self, cache_dir):
+        entry = None
+        if cache_dir is not None:
+            key = self.name or surface_cache_key(self.xy, self.values, self.smoothing)
+            entry = os.path.join(cache_dir, f"{key}.npz")
+            if os.path.exists(entry):
+                with np.load(entry) as cached:
+                    if ("xy" in cached.files and np.array_equal(cached["xy"], self.xy)
+                            and np.array_equal(cached["values"], self.values) and tuple(cached["axes"].tolist()) == self.axes
+                            and float(cached["smoothing"]) == self.smoothing):
+                        return cached["weights"], cached["coeffs"]
+        weights, coeffs = self._fit()
+        if entry is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            staging = entry + ".tmp.npz"
+            np.savez(staging, xy=self.xy, values=self.values, axes=np.array(self.axes),
+                     smoothing=self.smoothing, weights=weights, coeffs=coeffs)
+            os.replace(staging, entry)
+        return weights, coeffs
+
+    def _fit(self):
+        xy = self._normalized(self.xy)
+        n = len(xy)
+        affine = _affine(xy)
+        # Too few points (or all on a line) for a spline: least-squares affine fit
+        if n < 3 or np.linalg.matrix_rank(affine) < 3:
+            coeffs = np.linalg.lstsq(affine, self.values, rcond=None)[0]
+            return np.zeros((n, len(self.axes))), coeffs
+
+        r = np.hypot(*(xy[:, None, :] - xy[None, :, :]).transpose(2, 0, 1))
+        system = np.zeros((n + 3, n + 3))
+        system[:n, :n] = _kernel(r) + self.smoothing * np.eye(n)
+        system[:n, n:] = affine
+        system[n:, :n] = affine.T
+        rhs = np.zeros((n + 3, len(self.axes)))
+        rhs[:n] = self.values
+        # Near-coincident points can still leave it singular: best fit instead
+        try:
+            solution = np.linalg.solve(system, rhs)
+        except np.linalg.LinAlgError:
+            solution = np.linalg.lstsq(system, rhs, rcond=None)[0]
+        return solution[:n], solution[n:]
+
+    # Values at (m, 2) stage positions, one column per axis
+    def evaluate(self, xy):
+        xy = self._normalized(np.asarray(xy, dtype=np.float64).reshape(-1, 2))
+        centres = self._normalized(self.xy)
+        out = np.empty((len(xy), len(self.axes)))
+        for start in range(0, len(xy), self.eval_block):
+            block = xy[start:start + self.eval_block]
+            r = np.hypot(block[:, None, 0] - centres[None, :, 0], block[:, None, 1] - centres[None, :, 1])
+            out[start:start + len(block)] = _kernel(r) @ self.weights + _affine(block) @ self.coeffs
+        return out
+
+    def __call__(self, xy):
+        return self.evaluate(xy)
+
+    # Hexapod poses for every point of a stage path, ready for run_pose_sequence
+    def poses(self, xy, base=None):
+        values = self.evaluate(xy)
+        base = dict(base or {})
+        return [{**base, **dict(zip(self.axes, row))} for row in values.tolist()]
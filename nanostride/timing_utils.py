@@ -0,0 +1,78 @@
+import numpy as np
+from collections import namedtuple
+from functools import lru_cache
+
+# Resonant scanner pixel timing
+# The mirror follows x(t) = -cos(2 pi f t), so pixels near the edges of the
+# sweep get more samples than pixels in the middle. The index map gives, for
+# every sample of one mirror period, the pixel it falls on (flattened over the
+# rows printed in that period); blank marks samples where the beam is off.
+PixelTiming = namedtuple("PixelTiming", ["index_map", "blank", "pixels_per_row", "rows_per_period",
+                                         "samples_per_period"])
+
+FLYBACK_POLICIES = ("blank", "bidirectional")
+SWEEP_PROFILES = ("sinusoidal", "linear")
+
+def _sweep_positions(n_samples, profile):
+    # Sample centres across one half period, as mirror position in [0, 1)
+    phase = (np.arange(n_samples) + 0.5) / n_samples
+    if profile == "sinusoidal":
+        return 0.5 - 0.5 * np.cos(np.pi * phase)
+    return phase
+
+# flyback="blank": one row per period, forward sweep only, beam off on the return.
+# flyback="bidirectional": two rows per period, the second printed on the
+# return sweep (right to left, so rows stay in image order, no serpentine flip).
+@lru_cache(maxsize=32)
+def pixel_timing(scan_frequency, sample_rate, pixels_per_row, flyback="blank", profile="sinusoidal"):
+    if flyback not in FLYBACK_POLICIES:
+        raise ValueError(f"flyback must be one of {FLYBACK_POLICIES}, got {flyback}")
+    if profile not in SWEEP_PROFILES:
+        raise ValueError(f"profile must be one of {SWEEP_PROFILES}, got {profile}")
+
+    samples_per_period = int(round(sample_rate / scan_frequency))
+    forward = samples_per_period // 2
+    back = samples_per_period - forward
+
+    forward_map = np.minimum((_sweep_positions(forward, profile) * pixels_per_row).astype(np.intp),
+                             pixels_per_row - 1)
+    # The centre of a sinusoidal sweep is fastest, every pixel there still needs a sample
+    if np.bincount(forward_map, minlength=pixels_per_row).min() == 0:
+        raise ValueError(
+            f"{forward} samples per sweep cannot resolve {pixels_per_row} pixels; "
+            f"raise the sample rate."
+        )
+    if flyback == "blank":
+        back_map = np.full(back, -1, dtype=np.intp)
+        rows_per_period = 1
+    else:
+        back_pixels = np.minimum((_sweep_positions(back, profile) * pixels_per_row).astype(np.intp),
+                                 pixels_per_row - 1)
+        back_map = pixels_per_row + (pixels_per_row - 1 - back_pixels)
+        rows_per_period = 2
+
+    index_map = np.concatenate([forward_map, back_map])
+    blank = index_map < 0
+    index_map[blank] = 0
+    index_map.flags.writeable = False
+    blank.flags.writeable = False
+    return PixelTiming(index_map, blank, pixels_per_row, rows_per_period, samples_per_period)
+
+# Resample a binary stack (layers, rows, pixels) or a single layer into
+# scanner-timed samples with one gather. Layers with an odd row count get a
+# blank row appended when two rows share a period.
+def apply_pixel_timing(stack, timing):
+    stack = np.asarray(stack)
+    if stack.shape[-1] != timing.pixels_per_row:
+        raise ValueError(f"stack is {stack.shape[-1]} pixels wide, timing map was built for {timing.pixels_per_row}.")
+
+    rows = stack.shape[-2]
+    if rows % timing.rows_per_period:
+        pad = [(0, 0)] * stack.ndim
+        pad[-2] = (0, timing.rows_per_period - rows % timing.rows_per_period)
+        stack = np.pad(stack, pad)
+
+    groups = stack.reshape(-1, timing.rows_per_period * stack.shape[-1])
+    samples = np.take(groups, timing.index_map, axis=1)
+    samples[:, timing.blank] = 0
+    return samples.reshape(-1)
@@ -0,0 +1,217 @@
+import numpy as np
+from collections import namedtuple
+
+# DXF toolpaths
+# Contours come out of the DXF as (n, 2) vertex arrays in mm; a closed contour
+# repeats its first vertex at the end. Before printing they are simplified
+# with Douglas-Peucker and ordered so that the non-printing travel between
+# them is short.
+DXF_ENTITIES = ("LWPOLYLINE", "POLYLINE", "LINE", "ARC", "CIRCLE", "ELLIPSE", "SPLINE")
+
+ToolpathReport = namedtuple("ToolpathReport", ["contours", "vertices", "print_length", "travel_length",
+                                               "print_time", "travel_time"])
+
+def _entities(layout):
+    for entity in layout:
+        if entity.dxftype() == "INSERT":
+            # Block references are expanded in place, nested ones too
+            yield from _entities(entity.virtual_entities())
+        elif entity.dxftype() in DXF_ENTITIES:
+            yield entity
+
+# scale converts drawing units to mm (L-Edit writes um). Arcs, bulges and
+# splines are flattened to within flatten_tolerance (mm).
+def load_dxf(path, scale=1e-3, flatten_tolerance=1e-4, layers=None):
+    import ezdxf
+    from ezdxf import path as dxf_path
+
+    doc = ezdxf.readfile(path)
+    contours = []
+    for entity in _entities(doc.modelspace()):
+        if layers is not None and entity.dxf.layer not in layers:
+            continue
+        outline = dxf_path.make_path(entity)
+        if len(outline) == 0:
+            continue
+        points = np.array([(v.x, v.y) for v in outline.flattening(flatten_tolerance / scale)]) * scale
+        closed = getattr(entity, "is_closed", False) or getattr(entity, "closed", False) or \
+            entity.dxftype() == "CIRCLE"
+        if closed and not np.array_equal(points[0], points[-1]):
+            points = np.vstack([points, points[:1]])
+        contours.append(points)
+    return contours
+
+def is_closed(contour):
+    return len(contour) > 2 and np.array_equal(contour[0], contour[-1])
+
+
+# Douglas-Peucker: keep the vertex farthest from the chord of each span while it
+# is more than tolerance away, then recurse into both halves. Endpoints stay.
+def simplify_contour(contour, tolerance):
+    contour = np.asarray(contour, dtype=float)
+    if len(contour) < 3 or tolerance <= 0:
+        return contour
+    keep = np.zeros(len(contour), dtype=bool)
+    keep[0] = keep[-1] = True
+    spans = [(0, len(contour) - 1)]
+    while spans:
+        first, last = spans.pop()
+        if last - first < 2:
+            continue
+        a, b = contour[first], contour[last]
+        inner = contour[first + 1:last]
+        chord = b - a
+        length = np.hypot(*chord)
+        if length == 0:
+            # Closed span: distance to the shared endpoint
+            distances = np.hypot(*(inner - a).T)
+        else:
+            distances = np.abs(chord[0] * (inner[:, 1] - a[1]) - chord[1] * (inner[:, 0] - a[0])) / length
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = first + 1 + farthest
+            keep[split] = True
+            spans.append((first, split))
+            spans.append((split, last))
+    return contour[keep]
+
+def simplify_contours(contours, tolerance):
+    return [simplify_contour(c, tolerance) for c in contours]
+
+
+# Greedy nearest-neighbour ordering from start. An open contour can be entered
+# from either end (and is then reversed); a closed one from any vertex (and is
+# rotated to start there), so every vertex is a candidate entry point.
+def order_contours(contours, start=(0.0, 0.0)):
+    if not contours:
+        return []
+    entries, owners, reverse = [], [], []
+    for i, contour in enumerate(contours):
+        if is_closed(contour):
+            entries.append(contour[:-1])
+            owners.append(np.full(len(contour) - 1, i))
+            reverse.append(np.zeros(len(contour) - 1, dtype=bool))
+        else:
+            entries.append(contour[[0, -1]])
+            owners.append([i, i])
+            reverse.append([False, True])
+    entries = np.concatenate(entries)
+    owners = np.concatenate(owners)
+    reverse = np.concatenate(reverse)
+    offsets = np.zeros(len(entries), dtype=np.intp)
+    for i, contour in enumerate(contours):
+        if is_closed(contour):
+            offsets[owners == i] = np.arange(len(contour) - 1)
+
+    available = np.ones(len(entries), dtype=bool)
+    position = np.asarray(start, dtype=float)
+    ordered = []
+    for _ in range(len(contours)):
+        distances = np.where(available, np.hypot(*(entries - position).T), np.inf)
+        pick = int(np.argmin(distances))
+        contour = contours[owners[pick]]
+        if is_closed(contour):
+            loop = contour[:-1]
+            contour = np.vstack([np.roll(loop, -offsets[pick], axis=0), loop[offsets[pick]:offsets[pick] + 1]])
+        elif reverse[pick]:
+            contour = contour[::-1]
+        ordered.append(contour)
+        available[owners == owners[pick]] = False
+        position = contour[-1]
+    return ordered
+
+
+# Look-ahead planning for StageController.run_trajectory
+# Corner speeds follow the junction deviation model: the path may cut a corner
+# by at most junction_deviation (mm) at the given acceleration. A forward and a
+# backward pass then cap every vertex speed so the stage can accelerate into it
+# and brake out of it. Returns the vertices without repeats, the velocity
+# vector at each vertex and the time to reach each vertex from the previous one.
+def plan_trajectory(points, velocity, acceleration, junction_deviation=0.005):
+    points = np.asarray(points, dtype=float)
+    keep = np.ones(len(points), dtype=bool)
+    keep[1:] = np.any(np.diff(points, axis=0) != 0, axis=1)
+    points = points[keep]
+    if len(points) < 2:
+        raise ValueError("A trajectory needs at least two distinct points.")
+
+    steps = np.diff(points, axis=0)
+    lengths = np.linalg.norm(steps, axis=1)
+    units = steps / lengths[:, None]
+
+    # Corner speed limits, zero at both ends
+    cos_theta = -np.einsum("ij,ij->i", units[:-1], units[1:])
+    sin_half = np.sqrt(np.clip(0.5 * (1 - cos_theta), 0, 1))
+    with np.errstate(divide="ignore"):
+        corner = np.sqrt(acceleration * junction_deviation * sin_half / (1 - sin_half))
+    speeds = np.concatenate([[0.0], np.minimum(corner, velocity), [0.0]])
+
+    for i in range(1, len(speeds)):
+        speeds[i] = min(speeds[i], np.sqrt(speeds[i - 1] ** 2 + 2 * acceleration * lengths[i - 1]))
+    for i in range(len(speeds) - 2, -1, -1):
+        speeds[i] = min(speeds[i], np.sqrt(speeds[i + 1] ** 2 + 2 * acceleration * lengths[i]))
+
+    # Trapezoidal (or triangular) profile time for every segment
+    v0, v1 = speeds[:-1], speeds[1:]
+    peak = np.sqrt((2 * acceleration * lengths + v0 ** 2 + v1 ** 2) / 2)
+    cruise = np.minimum(peak, velocity)
+    ramps = (2 * cruise - v0 - v1) / acceleration
+    flat = (lengths - (2 * cruise ** 2 - v0 ** 2 - v1 ** 2) / (2 * acceleration)) / cruise
+    intervals = np.concatenate([[0.0], ramps + np.maximum(flat, 0)])
+
+    # Direction at each vertex bisects the segments on either side
+    tangents = np.concatenate([units[:1], units[:-1] + units[1:], units[-1:]])
+    norms = np.linalg.norm(tangents, axis=1)
+    tangents = np.divide(tangents, norms[:, None], out=np.zeros_like(tangents), where=norms[:, None] > 0)
+    return points, tangents * speeds[:, None], intervals
+
+# Rest-to-rest move time over distance at the given velocity and acceleration
+def _move_time(distance, velocity, acceleration):
+    distance = np.asarray(distance, dtype=float)
+    short = distance < velocity ** 2 / acceleration
+    return np.where(short, 2 * np.sqrt(distance / acceleration), distance / velocity + velocity / acceleration)
+
+# Vertex count, path lengths and estimated time of printing contours in the
+# given order: each contour as one look-ahead trajectory, travel between them
+# as rest-to-rest moves at travel_velocity
+def estimate_toolpath(contours, start=(0.0, 0.0), velocity=20, acceleration=500, travel_velocity=50,
+                      junction_deviation=0.005):
+    position = np.asarray(start, dtype=float)
+    vertices = print_length = travel_length = print_time = travel_time = 0.0
+    for contour in contours:
+        hop = float(np.hypot(*(contour[0] - position)))
+        travel_length += hop
+        travel_time += float(_move_time(hop, travel_velocity, acceleration))
+        vertices += len(contour)
+        print_length += float(np.hypot(*np.diff(contour, axis=0).T).sum())
+        if len(contour) > 1 and np.any(contour != contour[0]):
+            print_time += float(plan_trajectory(contour, velocity, acceleration, junction_deviation)[2].sum())
+        position = contour[-1]
+    return ToolpathReport(len(contours), int(vertices), print_length, travel_length, print_time, travel_time)
+
+def format_toolpath_report(before, after):
+    rows = [
+        ("Contours", f"{before.contours}", f"{after.contours}"),
+        ("Vertices", f"{before.vertices}", f"{after.vertices}"),
+        ("Print length (mm)", f"{before.print_length:.3f}", f"{after.print_length:.3f}"),
+        ("Travel length (mm)", f"{before.travel_length:.3f}", f"{after.travel_length:.3f}"),
+        ("Print time (s)", f"{before.print_time:.3f}", f"{after.print_time:.3f}"),
+        ("Travel time (s)", f"{before.travel_time:.3f}", f"{after.travel_time:.3f}"),
+        ("Total time (s)", f"{before.print_time + before.travel_time:.3f}",
+         f"{after.print_time + after.travel_time:.3f}"),
+    ]
+    lines = [f"{'':<20}{'before':>14}{'after':>14}"]
+    lines += [f"{name:<20}{b:>14}{a:>14}" for name, b, a in rows]
+    return "\n".join(lines)
+
+# Load, simplify and order a DXF. Returns the contours ready for
+# StageController.run_trajectory and the before/after reports.
+def dxf_toolpath(path, tolerance=1e-3, start=(0.0, 0.0), scale=1e-3, layers=None, velocity=20,
+                 acceleration=500, travel_velocity=50, verbose=True):
+    contours = load_dxf(path, scale=scale, layers=layers)
+    before = estimate_toolpath(contours, start, velocity, acceleration, travel_velocity)
+    contours = order_contours(simplify_contours(contours, tolerance), start)
+    after = estimate_toolpath(contours, start, velocity, acceleration, travel_velocity)
+    if verbose:
+        print(format_toolpath_report(before, after))
+    return contours, before, after
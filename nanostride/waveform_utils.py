@@ -1,37 +1,136 @@
 import numpy as np
 from PIL import Image
 import os
-import nifgen
 import time
 import math
+import struct
+import threading
+import queue
+import hashlib
+import csv
+import json
+from collections import namedtuple
+try:
+    from .stack_utils import list_slice_images, load_slice_stack_parallel, open_slice_source
+    from .timing_utils import apply_pixel_timing
+    from .backends import load_driver
+except ImportError:
+    from stack_utils import list_slice_images, load_slice_stack_parallel, open_slice_source
+    from timing_utils import apply_pixel_timing
+    from backends import load_driver
 
-def create_bidirectional_waveforms(image_dir, serpentine=True):
-    waveforms = []
+nifgen = load_driver("nifgen")
 
-    image_files = sorted([
-        f for f in os.listdir(image_dir)
-        if f.endswith(".png")
-    ])
+# Slice stack loading from a PNG directory, an .sl1 archive or a packed .nss
+# stack (workers > 1 decodes PNG directories in a process pool)
+def load_slice_stack(image_dir, workers=1):
+    if image_dir.endswith((".sl1", ".nss")):
+        with open_slice_source(image_dir) as source:
+            return source.load_stack()
+    if workers != 1:
+        return load_slice_stack_parallel(image_dir, workers)
 
+    image_files = list_slice_images(image_dir)
+    if not image_files:
+        raise FileNotFoundError(f"No PNG slice images found in {image_dir}.")
+
+    stack = None
     for i, filename in enumerate(image_files):
         path = os.path.join(image_dir, filename)
-        img = Image.open(path).convert("L")
-        binary = (np.array(img) > 128).astype(np.uint8)
+        img = np.asarray(Image.open(path).convert("L"))
+        if stack is None:
+            stack = np.empty((len(image_files),) + img.shape, dtype=np.uint8)
+        elif img.shape != stack.shape[1:]:
+            raise ValueError(f"{filename} is {img.shape}, expected {stack.shape[1:]}")
+        # Threshold straight into the stack, no per-layer temporaries
+        np.greater(img, 128, out=stack[i])
+    return stack
 
-        for row_index in range(binary.shape[0]):
-            row = binary[row_index]
-            if serpentine and ((i % 2 == 0 and row_index % 2 == 1) or
-                               (i % 2 == 1 and row_index % 2 == 0)):
-                row = row[::-1]
-            waveforms.append(row)
-    
-    return np.concatenate(waveforms)
+def iter_slice_layers(image_dir):
+    if image_dir.endswith((".sl1", ".nss")):
+        with open_slice_source(image_dir) as source:
+            yield from source
+        return
+
+    image_files = list_slice_images(image_dir)
+    if not image_files:
+        raise FileNotFoundError(f"No PNG slice images found in {image_dir}.")
+
+    for filename in image_files:
+        path = os.path.join(image_dir, filename)
+        img = np.asarray(Image.open(path).convert("L"))
+        yield (img > 128).view(np.uint8)
+
+# Serpentine flattening: even layers flip odd rows, odd layers flip even rows.
+# first_layer is the global index of stack[0], so partial stacks keep parity.
+def flatten_slice_stack(stack, serpentine=True, out=None, first_layer=0):
+    if out is None:
+        out = np.empty(stack.size, dtype=np.uint8)
+    view = out.reshape(stack.shape)
+    if serpentine:
+        even = first_layer % 2
+        odd = 1 - even
+        view[even::2, 0::2] = stack[even::2, 0::2]
+        view[even::2, 1::2] = stack[even::2, 1::2, ::-1]
+        view[odd::2, 0::2] = stack[odd::2, 0::2, ::-1]
+        view[odd::2, 1::2] = stack[odd::2, 1::2]
+    else:
+        view[...] = stack
+    return out
+
+def create_bidirectional_waveforms(image_dir, serpentine=True, workers=1):
+    return flatten_slice_stack(load_slice_stack(image_dir, workers), serpentine)
+
+# Bounded-memory generation: yields chunks of chunk_bytes (rounded down to a
+# whole number of sample_increment samples), the last one zero-padded up to
+# the next increment. At most one chunk is filled while the previous one is
+# held by the consumer, whatever the number of layers.
+# With a timing_utils.PixelTiming, layers are resampled onto the scanner sweep
+# instead of serpentine-flattened one sample per pixel.
+def iter_waveform_chunks(layers, serpentine=True, chunk_bytes=16 * 1024 * 1024,
+                         sample_increment=64, dtype=np.uint8, timing=None):
+    dtype = np.dtype(dtype)
+    chunk_samples = (chunk_bytes // dtype.itemsize) // sample_increment * sample_increment
+    if chunk_samples == 0:
+        raise ValueError(
+            f"chunk_bytes={chunk_bytes} is smaller than one increment of "
+            f"{sample_increment} {dtype} samples."
+        )
+
+    chunk = np.empty(chunk_samples, dtype=dtype)
+    filled = 0
+    for i, layer in enumerate(layers):
+        if timing is not None:
+            samples = apply_pixel_timing(layer, timing)
+        else:
+            samples = flatten_slice_stack(layer[np.newaxis], serpentine, first_layer=i)
+        start = 0
+        while start < samples.size:
+            n = min(chunk_samples - filled, samples.size - start)
+            chunk[filled:filled + n] = samples[start:start + n]
+            filled += n
+            start += n
+            if filled == chunk_samples:
+                yield chunk
+                chunk = np.empty(chunk_samples, dtype=dtype)
+                filled = 0
+
+    if filled:
+        padded = -(-filled // sample_increment) * sample_increment
+        chunk[filled:padded] = 0
+        yield chunk[:padded]
+
+def iter_bidirectional_waveforms(image_dir, serpentine=True, chunk_bytes=16 * 1024 * 1024,
+                                 sample_increment=64, dtype=np.uint8, timing=None):
+    return iter_waveform_chunks(iter_slice_layers(image_dir), serpentine,
+                                chunk_bytes, sample_increment, dtype, timing)
+'''
 def create_bidirectional_waveforms(image_dir, serpentine=True):
     n = 100
     black = np.zeros(n)
     white = np.zeros(n)
     white[: n // 2] = 1
-    
+
     waveforms = []
 
     image_files = sorted([
@@ -51,7 +150,7 @@ def create_bidirectional_waveforms(image_dir, serpentine=True):
                 else:
                     waveforms.append(white)
         return np.concatenate(waveforms)
-    '''
+
 def create_bidirectional_waveforms(image_dir,
                                   serpentine=True,
                                   pixels_per_row=120,
@@ -95,6 +194,274 @@ def save_binary_waveform(waveform, filename):
     float_waveform_normalized.astype('<f8').tofile(f"{filename}.bin")
     #float_waveform_normalized.tofile(f"{filename}.bin")
 
+# Waveform files with a header: 64-byte header followed by the raw samples,
+# so readers can np.memmap the data in place. Binary samples are written as
+# -full_scale/+full_scale (int16 uses the AWG's native full scale).
+WAVEFORM_MAGIC = b"NSWF"
+WAVEFORM_HEADER_FORMAT = "<4sH8sdQ"  # magic, version, dtype, sample rate, sample count
+WAVEFORM_HEADER_SIZE = 64
+WAVEFORM_DTYPES = {"int16": 32767, "float32": 1.0, "float64": 1.0}
+
+class WaveformWriter:
+    def __init__(self, path, dtype="int16", sample_rate=25e6):
+        if np.dtype(dtype).name not in WAVEFORM_DTYPES:
+            raise ValueError(f"dtype must be one of {list(WAVEFORM_DTYPES)}, got {dtype}")
+        self.path = path
+        self.dtype = np.dtype(dtype).newbyteorder("<")
+        self.sample_rate = sample_rate
+        self.sample_count = 0
+        full_scale = WAVEFORM_DTYPES[self.dtype.name]
+        self._levels = np.array([-full_scale, full_scale], dtype=self.dtype)
+        self._file = open(path, "w+b")
+        self._write_header()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _write_header(self):
+        header = struct.pack(WAVEFORM_HEADER_FORMAT, WAVEFORM_MAGIC, 1,
+                             self.dtype.str.encode(), self.sample_rate, self.sample_count)
+        self._file.seek(0)
+        self._file.write(header.ljust(WAVEFORM_HEADER_SIZE, b"\0"))
+        self._file.flush()
+
+    # Append a chunk of 0/1 samples, mapped straight into the grown file
+    def append(self, chunk):
+        n = len(chunk)
+        if n == 0:
+            return
+        offset = WAVEFORM_HEADER_SIZE + self.sample_count * self.dtype.itemsize
+        self._file.truncate(offset + n * self.dtype.itemsize)
+        out = np.memmap(self._file, dtype=self.dtype, mode="r+", offset=offset, shape=(n,))
+        np.take(self._levels, np.asarray(chunk, dtype=np.uint8), out=out)
+        out.flush()
+        del out
+        self.sample_count += n
+        self._write_header()
+
+    def close(self):
+        if not self._file.closed:
+            self._write_header()
+            self._file.close()
+
+def read_waveform_header(path):
+    with open(path, "rb") as f:
+        raw = f.read(WAVEFORM_HEADER_SIZE)
+    if len(raw) < WAVEFORM_HEADER_SIZE or raw[:4] != WAVEFORM_MAGIC:
+        return None
+    _, version, dtype, sample_rate, sample_count = struct.unpack_from(WAVEFORM_HEADER_FORMAT, raw)
+    return {
+        "version": version,
+        "dtype": np.dtype(dtype.rstrip(b"\0").decode()),
+        "sample_rate": sample_rate,
+        "sample_count": sample_count,
+    }
+
+def open_waveform_file(path):
+    header = read_waveform_header(path)
+    if header is None:
+        raise ValueError(f"{path} is not a NanoStride waveform file.")
+    if header["sample_count"] == 0:
+        return np.empty(0, dtype=header["dtype"]), header
+    samples = np.memmap(path, dtype=header["dtype"], mode="r",
+                        offset=WAVEFORM_HEADER_SIZE, shape=(header["sample_count"],))
+    return samples, header
+
+
+# Sequence output mode: each distinct row is uploaded once, consecutive repeats
+# become loop counts. sequence holds indices into unique_rows, one per step.
+RowSequence = namedtuple("RowSequence", ["unique_rows", "sequence", "loop_counts", "compression_ratio"])
+
+def compile_row_sequence(rows):
+    rows = np.ascontiguousarray(rows)
+    if len(rows) == 0:
+        raise ValueError("No rows to compile.")
+
+    # Run-length merge consecutive identical rows
+    repeats = np.all(rows[1:] == rows[:-1], axis=1)
+    run_starts = np.flatnonzero(np.concatenate(([True], ~repeats)))
+    loop_counts = np.diff(np.append(run_starts, len(rows))).tolist()
+
+    # Deduplicate the run heads by content hash
+    unique_index = {}
+    unique_rows = []
+    sequence = []
+    for start in run_starts:
+        key = hashlib.blake2b(rows[start].tobytes(), digest_size=16).digest()
+        if key not in unique_index:
+            unique_index[key] = len(unique_rows)
+            unique_rows.append(rows[start])
+        sequence.append(unique_index[key])
+
+    return RowSequence(unique_rows, sequence, loop_counts, len(rows) / len(unique_rows))
+
+# The compression stats are on the returned RowSequence; verbose prints them
+def create_row_sequence(session, rows, verbose=False):
+    compiled = compile_row_sequence(np.asarray(rows, dtype=np.float64))
+    handles = [session.create_waveform(row) for row in compiled.unique_rows]
+    sequence_handle = session.create_arb_sequence(
+        [handles[i] for i in compiled.sequence], compiled.loop_counts
+    )
+    if verbose:
+        print(format_row_sequence(compiled))
+    return sequence_handle, compiled
+
+def format_row_sequence(compiled):
+    return (f"{sum(compiled.loop_counts)} rows -> {len(compiled.unique_rows)} waveforms, "
+            f"{len(compiled.sequence)} sequence steps (compression {compiled.compression_ratio:.1f}x)")
+
+# Synchronized multi-channel output
+# Pixel modulation, the slow-axis (Y) galvo and the shutter come out of one
+# buffer on one sample clock, so a single hardware-timed task drives all three
+# and they cannot drift against each other. Every layer is followed by
+# gap_samples (at least one) with the beam and shutter off while the galvo
+# returns to its first row, so the shutter gates each layer. The galvo either steps once per row ("staircase") or sweeps
+# linearly, crossing each row's staircase level at the middle of that row
+# ("ramp").
+# The default channels follow the bench wiring, which spans two cards: pixel
+# and galvo on PXI1Slot6, shutter on PXI1Slot2 (LaserController's shutter).
+# play_multichannel_waveform runs channels on several cards as one DAQmx
+# multi-device task: it locks every card to the chassis' PXI_Clk10 and DAQmx
+# shares the start trigger, so the cards must sit in the same PXI chassis.
+# Elsewhere, map all three channels onto one device.
+MULTICHANNEL_NAMES = ("pixel", "galvo", "shutter")
+GALVO_PROFILES = ("staircase", "ramp")
+DEFAULT_MULTICHANNEL_CHANNELS = {"pixel": "PXI1Slot6/ao1", "galvo": "PXI1Slot6/ao0", "shutter": "PXI1Slot2/ao1"}
+
+MultiChannelWaveform = namedtuple("MultiChannelWaveform", ["data", "channel_names", "sample_rate",
+                                                           "samples_per_layer", "layers"])
+
+# Row coordinate of every sample of one layer: integer rows for the staircase,
+# fractional (row centres at .0) for the ramp. With a PixelTiming the forward
+# sweep of a period prints its first row and the return sweep its second.
+def _row_positions(rows, samples_per_row, timing, profile):
+    if timing is None:
+        n = rows * samples_per_row
+        if profile == "staircase":
+            return np.arange(n) // samples_per_row
+        return (np.arange(n) + 0.5) / samples_per_row - 0.5
+    periods = -(-rows // timing.rows_per_period)
+    period = timing.samples_per_period
+    forward = period // 2
+    offsets = np.zeros(period)
+    if timing.rows_per_period == 2:
+        offsets[forward:] = 1
+    rows_at = (np.arange(periods)[:, None] * timing.rows_per_period + offsets[None, :]).reshape(-1)
+    if profile == "staircase":
+        return rows_at
+    per_row = period / timing.rows_per_period
+    return (np.arange(periods * period) + 0.5) / per_row - 0.5
+
+def _multichannel_layer(layer, index, serpentine, samples_per_pixel, timing, galvo_profile, galvo_range,
+                        pixel_levels, shutter_levels, gap_samples):
+    rows, width = layer.shape
+    if timing is not None:
+        pixels = apply_pixel_timing(layer, timing)
+    else:
+        pixels = np.repeat(flatten_slice_stack(layer[np.newaxis], serpentine, first_layer=index),
+                           samples_per_pixel)
+    n = len(pixels)
+    block = np.empty((len(MULTICHANNEL_NAMES), n + gap_samples))
+
+    lo, hi = pixel_levels
+    block[0, :n] = np.where(pixels.astype(bool), hi, lo)
+    block[0, n:] = lo
+
+    positions = _row_positions(rows, width * samples_per_pixel, timing, galvo_profile)
+    start, end = galvo_range
+    step = (end - start) / max(rows - 1, 1)
+    block[1, :n] = start + np.clip(positions, 0, rows - 1) * step
+    block[1, n:] = start
+
+    closed, opened = shutter_levels
+    block[2, :n] = opened
+    block[2, n:] = closed
+    return block
+
+# Per-layer (channels, samples) blocks, for streaming stacks too large to hold
+def iter_multichannel_layers(layers, serpentine=True, samples_per_pixel=1, timing=None,
+                             galvo_profile="staircase", galvo_range=(-1.0, 1.0), pixel_levels=(0.0, 1.0),
+                             shutter_levels=(0.0, 5.0), gap_samples=1):
+    if galvo_profile not in GALVO_PROFILES:
+        raise ValueError(f"galvo_profile must be one of {GALVO_PROFILES}, got {galvo_profile}")
+    if gap_samples < 1:
+        raise ValueError("gap_samples must be at least 1 so the shutter closes between layers.")
+    for i, layer in enumerate(layers):
+        yield _multichannel_layer(np.asarray(layer), i, serpentine, samples_per_pixel, timing, galvo_profile,
+                                  galvo_range, pixel_levels, shutter_levels, gap_samples)
+
+# The whole stack as one buffer. layout="channels" gives (channels, samples),
+# what nidaqmx writes to a multi-channel task; layout="interleaved" gives the
+# flat c0 c1 c2 c0 c1 c2 ... order of interleaved multi-channel AWG writes.
+def build_multichannel_waveform(stack, sample_rate, serpentine=True, samples_per_pixel=1, timing=None,
+                                galvo_profile="staircase", galvo_range=(-1.0, 1.0), pixel_levels=(0.0, 1.0),
+                                shutter_levels=(0.0, 5.0), gap_samples=1, layout="channels"):
+    if layout not in ("channels", "interleaved"):
+        raise ValueError(f"layout must be 'channels' or 'interleaved', got {layout}")
+    stack = np.asarray(stack)
+    if stack.ndim == 2:
+        stack = stack[np.newaxis]
+    blocks = iter_multichannel_layers(stack, serpentine, samples_per_pixel, timing, galvo_profile,
+                                      galvo_range, pixel_levels, shutter_levels, gap_samples)
+    first = next(blocks)
+    data = np.empty((len(MULTICHANNEL_NAMES), first.shape[1] * len(stack)))
+    data[:, :first.shape[1]] = first
+    for i, block in enumerate(blocks, start=1):
+        data[:, i * first.shape[1]:(i + 1) * first.shape[1]] = block
+    if layout == "interleaved":
+        data = np.ascontiguousarray(data.T).reshape(-1)
+    return MultiChannelWaveform(data, MULTICHANNEL_NAMES, sample_rate, first.shape[1], len(stack))
+
+# Play a "channels" layout waveform as one finite, hardware-timed nidaqmx task.
+# channels maps pixel/galvo/shutter to physical channels. The LaserController
+# holding the shutter channel (the shared laser_utils one by default, as in
+# the GUI) lends it for the run, since its on-demand task keeps it reserved.
+def play_multichannel_waveform(waveform, channels=None, laser=None, sample_clock_source="",
+                               trigger_source=None, timeout=None):
+    channels = dict(DEFAULT_MULTICHANNEL_CHANNELS, **(channels or {}))
+    data = np.asarray(waveform.data)
+    if data.ndim != 2:
+        raise ValueError("play_multichannel_waveform needs the 'channels' layout.")
+    if timeout is None:
+        timeout = 10.0 + data.shape[1] / waveform.sample_rate
+    # Only multi-channel playback needs DAQmx and the laser; importing them
+    # here keeps the rest of the module usable without nidaqmx
+    nidaqmx = load_driver("nidaqmx")
+    try:
+        from . import laser_utils
+    except ImportError:
+        import laser_utils
+
+    def play():
+        with nidaqmx.Task() as task:
+            for name in waveform.channel_names:
+                task.ao_channels.add_ao_voltage_chan(channels[name])
+            # Multi-device task: phase-lock every card to the chassis clock
+            if len({channels[name].split("/")[0] for name in waveform.channel_names}) > 1:
+                task.timing.ref_clk_src = "PXI_Clk10"
+                task.timing.ref_clk_rate = 10e6
+            task.timing.cfg_samp_clk_timing(
+                waveform.sample_rate,
+                source=sample_clock_source,
+                sample_mode=nidaqmx.constants.AcquisitionType.FINITE,
+                samps_per_chan=data.shape[1],
+            )
+            if trigger_source is not None:
+                task.triggers.start_trigger.cfg_dig_edge_start_trig(trigger_source)
+            task.write(data, auto_start=False)
+            task.start()
+            task.wait_until_done(timeout=timeout)
+
+    if laser is None:
+        laser = laser_utils.laser_controller()
+    if channels["shutter"] != laser.channels["shutter"]:
+        play()
+    else:
+        with laser.lend_shutter():
+            play()
 
 # Waveform streaming functionalities
 
@@ -113,45 +480,358 @@ def allocation_size(waveform):
                 valid_chunks.add(complement)
     return(max(valid_chunks) if valid_chunks else None)
 
-def stream_waveform(waveform_path):
+# Chunk planning: equal chunks that respect the device's minimum waveform
+# size and sample increment and fit the memory budget. Instead of searching
+# for a divisor of the file size, the last chunk is padded (pad_samples).
+ChunkPlan = namedtuple("ChunkPlan", ["chunk_samples", "num_chunks", "pad_samples", "chunk_bytes"])
+
+def plan_chunks(total_samples, bytes_per_sample=8, min_samples=64, sample_increment=64,
+                memory_budget=10 * 1024 * 1024):
+    if total_samples <= 0:
+        raise ValueError("total_samples must be positive.")
+    max_samples = (memory_budget // bytes_per_sample) // sample_increment * sample_increment
+    if max_samples < min_samples:
+        raise ValueError(
+            f"memory_budget={memory_budget} cannot hold the minimum waveform of "
+            f"{min_samples} samples at {bytes_per_sample} bytes per sample."
+        )
+
+    num_chunks = -(-total_samples // max_samples)
+    chunk_samples = -(-total_samples // num_chunks)
+    chunk_samples = -(-chunk_samples // sample_increment) * sample_increment
+    chunk_samples = max(chunk_samples, -(-min_samples // sample_increment) * sample_increment)
+    pad_samples = num_chunks * chunk_samples - total_samples
+    return ChunkPlan(chunk_samples, num_chunks, pad_samples, chunk_samples * bytes_per_sample)
+
+# Normalized chunks from either a raw float64 .bin or a headered file, in the
+# requested dtype (float32/float64 in [-1, 1], int16 at AWG full scale).
+# Every chunk has plan.chunk_samples samples; the tail is padded with the off level.
+def read_waveform_chunks(waveform_path, min_samples=64, sample_increment=64,
+                         memory_budget=10 * 1024 * 1024, dtype=np.float32):
+    header = read_waveform_header(waveform_path)
+    if header is not None:
+        samples, header = open_waveform_file(waveform_path)
+        full_scale = WAVEFORM_DTYPES[header["dtype"].name]
+    else:
+        samples = np.memmap(waveform_path, dtype='<f8', mode="r")
+        full_scale = 1.0
+
+    dtype = np.dtype(dtype)
+    out_scale = WAVEFORM_DTYPES[dtype.name]
+    plan = plan_chunks(len(samples), dtype.itemsize, min_samples, sample_increment, memory_budget)
+    for start in range(0, len(samples), plan.chunk_samples):
+        data = np.full(plan.chunk_samples, -out_scale, dtype=dtype)
+        part = samples[start:start + plan.chunk_samples]
+        if out_scale == full_scale:
+            data[:len(part)] = part
+        else:
+            data[:len(part)] = part * (out_scale / full_scale)
+        yield data
+
+# Run a chunk iterator on a background thread, keeping up to depth chunks
+# ready so file reads overlap with device writes
+def prefetch_chunks(chunks, depth=2):
+    ready = queue.Queue(maxsize=depth)
+    done = object()
+
+    def reader():
+        try:
+            for chunk in chunks:
+                ready.put(chunk)
+        except Exception as e:
+            ready.put(e)
+        ready.put(done)
+
+    threading.Thread(target=reader, daemon=True).start()
+    while True:
+        chunk = ready.get()
+        if chunk is done:
+            return
+        if isinstance(chunk, Exception):
+            raise chunk
+        yield chunk
+
+# Streaming telemetry
+# One sample per device write (and per drain poll): the buffer fill polled just
+# before the write, the low point of the cycle and so the real headroom, the
+# fill just after it, how long the write call took and the producer's
+# throughput since the previous write. Samples go into a fixed-size ring, the
+# newest capacity kept. A fill below headroom_threshold of the buffer is
+# flagged as low headroom; an empty buffer is an underrun, the generator has
+# run out of data and the part is ruined.
+TELEMETRY_FIELDS = ("time", "fill", "fill_after", "write_latency", "chunk_samples", "throughput",
+                    "low_headroom", "underrun")
+
+class StreamTelemetry:
+    def __init__(self, buffer_samples=None, sample_rate=None, capacity=100000, headroom_threshold=0.1):
+        self.buffer_samples = buffer_samples
+        self.sample_rate = sample_rate
+        self.capacity = capacity
+        self.headroom_threshold = headroom_threshold
+        self._ring = np.zeros(capacity, dtype=[(name, np.float64) for name in TELEMETRY_FIELDS])
+        self._count = 0
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._last_write = None
+        self.low_headroom_events = 0
+        self.underruns = 0
+        self.min_fill = None
+
+    def start(self, buffer_samples, sample_rate):
+        self.buffer_samples = buffer_samples
+        self.sample_rate = sample_rate
+        self._started = time.perf_counter()
+        self._last_write = None
+
+    # space_available is the space polled before the write, space_after the
+    # space once it returned (same as before for samples without a write).
+    # flag=False for samples where a low fill is expected (prefill, final drain).
+    def record(self, space_available, write_latency=0.0, chunk_samples=0, flag=True, space_after=None):
+        now = time.perf_counter()
+        fill = self.buffer_samples - space_available
+        fill_after = fill if space_after is None else self.buffer_samples - space_after
+        throughput = 0.0
+        if chunk_samples:
+            if self._last_write is not None and now > self._last_write:
+                throughput = chunk_samples / (now - self._last_write)
+            self._last_write = now
+        low = flag and fill < self.headroom_threshold * self.buffer_samples
+        underrun = flag and fill <= 0
+        with self._lock:
+            self._ring[self._count % self.capacity] = (now - self._started, fill, fill_after, write_latency,
+                                                       chunk_samples, throughput, low, underrun)
+            self._count += 1
+            if low:
+                self.low_headroom_events += 1
+            if underrun:
+                self.underruns += 1
+            if flag:
+                self.min_fill = fill if self.min_fill is None else min(self.min_fill, fill)
+        return low
+
+    # Recorded samples in time order, oldest dropped once the ring wrapped
+    def timeline(self):
+        with self._lock:
+            if self._count <= self.capacity:
+                return self._ring[:self._count].copy()
+            start = self._count % self.capacity
+            return np.concatenate([self._ring[start:], self._ring[:start]])
+
+    def low_headroom(self):
+        timeline = self.timeline()
+        return timeline[timeline["low_headroom"] > 0]
+
+    def underrun_times(self):
+        timeline = self.timeline()
+        return timeline["time"][timeline["underrun"] > 0]
+
+    def summary(self):
+        timeline = self.timeline()
+        writes = timeline[timeline["chunk_samples"] > 0]
+        summary = {
+            "samples": int(self._count),
+            "dropped": int(max(0, self._count - self.capacity)),
+            "buffer_samples": self.buffer_samples,
+            "sample_rate": self.sample_rate,
+            "headroom_threshold": self.headroom_threshold,
+            "low_headroom_events": self.low_headroom_events,
+            "underruns": self.underruns,
+            "min_fill": self.min_fill,
+        }
+        if len(writes):
+            summary["write_latency_median"] = float(np.median(writes["write_latency"]))
+            summary["write_latency_max"] = float(writes["write_latency"].max())
+            rates = writes["throughput"][writes["throughput"] > 0]
+            if len(rates):
+                summary["throughput_median"] = float(np.median(rates))
+                summary["throughput_min"] = float(rates.min())
+        if self.min_fill is not None and self.sample_rate:
+            summary["min_headroom_seconds"] = self.min_fill / self.sample_rate
+        return summary
+
+    def to_csv(self, path):
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(TELEMETRY_FIELDS)
+            writer.writerows(self.timeline().tolist())
+
+    def to_json(self, path):
+        timeline = self.timeline()
+        with open(path, "w") as f:
+            json.dump({"summary": self.summary(),
+                       "timeline": {name: timeline[name].tolist() for name in TELEMETRY_FIELDS}}, f)
+
+    # CSV or JSON by extension
+    def export(self, path):
+        if path.endswith(".json"):
+            self.to_json(path)
+        else:
+            self.to_csv(path)
+
+    def report(self):
+        summary = self.summary()
+        lines = [f"Telemetry: {summary['samples']} samples, {summary['low_headroom_events']} below "
+                 f"{self.headroom_threshold:.0%} headroom"]
+        if self.underruns:
+            lines.append(f"UNDERRUN: the buffer ran dry {self.underruns} times")
+        if "min_headroom_seconds" in summary:
+            lines.append(f"Lowest fill: {summary['min_fill']:.0f} samples "
+                         f"({summary['min_headroom_seconds'] * 1e3:.1f} ms of output)")
+        if "write_latency_median" in summary:
+            lines.append(f"Write latency: median {summary['write_latency_median'] * 1e3:.2f} ms, "
+                         f"max {summary['write_latency_max'] * 1e3:.2f} ms")
+        if "throughput_median" in summary:
+            lines.append(f"Producer throughput: median {summary['throughput_median'] / 1e6:.2f} MS/s, "
+                         f"min {summary['throughput_min'] / 1e6:.2f} MS/s")
+        return "\n".join(lines)
+
+# telemetry (a StreamTelemetry) records the run; telemetry_path exports it
+# afterwards as CSV, or JSON for a .json path. Returns the telemetry.
+# Samples for stream_waveform as int16 at AWG full scale, in pieces of at most
+# chunk_samples. Chunks from iter_waveform_chunks hold levels in [-1, 1] (pixel
+# values 0/1 with the default uint8); int16 chunks pass through unchanged.
+def _stream_chunks(chunks, chunk_samples):
+    full_scale = WAVEFORM_DTYPES["int16"]
+    for chunk in chunks:
+        chunk = np.asarray(chunk)
+        if chunk.dtype != np.int16:
+            chunk = (chunk.astype(np.float32) * full_scale).astype(np.int16)
+        for start in range(0, len(chunk), chunk_samples):
+            yield chunk[start:start + chunk_samples]
+
+# waveform is a waveform file path, read chunk by chunk, or an iterable of
+# chunks such as iter_bidirectional_waveforms gives, so the whole waveform is
+# never held in memory. Generation that frees no buffer space for idle_timeout
+# seconds (start trigger never came, device stalled) aborts the session and
+# raises TimeoutError; None waits forever.
+def stream_waveform(waveform, persistent=True, resource="Dev1", sample_rate=25e6,
+                    buffer_bytes=80 * 1024 * 1024, chunk_bytes=8 * 1024 * 1024,
+                    trigger_source=None, poll_interval=0.001, telemetry=None, telemetry_path=None,
+                    idle_timeout=10.0):
+    if not persistent:
+        return stream_waveform_per_chunk(waveform)
+    if chunk_bytes > buffer_bytes:
+        raise ValueError("chunk_bytes must not exceed buffer_bytes.")
+    if telemetry is None and telemetry_path is not None:
+        telemetry = StreamTelemetry()
+
+    # int16 is the AWG's native format: half the bus traffic of float64, no list conversion
+    if isinstance(waveform, (str, os.PathLike)):
+        waveform = read_waveform_chunks(waveform, memory_budget=chunk_bytes, dtype=np.int16)
+    chunks = prefetch_chunks(_stream_chunks(waveform, chunk_bytes // 2))
+    off = None
+
+    with nifgen.Session(resource) as session:
+        session.output_mode = nifgen.OutputMode.ARB
+        session.arb_sample_rate = sample_rate
+
+        # One onboard streaming buffer for the whole waveform
+        buffer_samples = buffer_bytes // 2
+        waveform_handle = session.allocate_waveform(buffer_samples)
+        session.streaming_waveform_handle = waveform_handle
+        session.configure_arb_waveform(waveform_handle, gain=1.0, offset=0.0)
+        if telemetry is not None:
+            telemetry.start(buffer_samples, sample_rate)
+
+        # space is the value polled before the write, recorded as the headroom
+        def write(chunk, space, flag=True):
+            start = time.perf_counter()
+            session.write_waveform(waveform_handle, chunk)
+            if telemetry is not None:
+                latency = time.perf_counter() - start
+                telemetry.record(space, latency, len(chunk), flag,
+                                 space_after=session.streaming_space_available_in_waveform)
+
+        # Poll until needed samples fit, raising once idle_timeout passes
+        # without generation freeing any space. record logs drain polls.
+        def wait_for_space(needed, record=False):
+            space = session.streaming_space_available_in_waveform
+            last, last_change = space, time.perf_counter()
+            while space < needed:
+                if record and telemetry is not None:
+                    telemetry.record(space, flag=False)
+                time.sleep(poll_interval)
+                space = session.streaming_space_available_in_waveform
+                if space != last:
+                    last, last_change = space, time.perf_counter()
+                elif idle_timeout is not None and time.perf_counter() - last_change > idle_timeout:
+                    raise TimeoutError(f"No waveform samples generated for {idle_timeout} s; "
+                                       "check the start trigger.")
+            return space
+
+        # Prefill while there is room for a full chunk
+        pending = next(chunks, None)
+        while pending is not None:
+            space = session.streaming_space_available_in_waveform
+            if space < len(pending):
+                break
+            write(pending, space, flag=False)
+            off = np.full(len(pending), -32767, dtype=np.int16)
+            pending = next(chunks, None)
+
+        if trigger_source is not None:
+            session.start_trigger_type = nifgen.StartTriggerType.DIGITAL_EDGE
+            session.digital_edge_start_trigger_source = trigger_source
+            session.digital_edge_start_trigger_edge = nifgen.StartTriggerDigitalEdgeEdge.RISING
+            session.trigger_mode = nifgen.TriggerMode.SINGLE
 
-    # Determine chunk size and number of chunks
-    chunk_size_bytes = allocation_size(waveform_path)
-    total_size_bytes = os.path.getsize(waveform_path)
-    num_chunks = total_size_bytes // chunk_size_bytes
-    
-    with open(waveform_path, "rb") as f:
-        for _ in range(num_chunks):
-            chunk = f.read(chunk_size_bytes)
+        # Producer: top the buffer up as generation frees space. Errors,
+        # a stall included, end the thread and are re-raised below.
+        errors = []
+        def producer():
+            try:
+                chunk = pending
+                while chunk is not None:
+                    write(chunk, wait_for_space(len(chunk)))
+                    chunk = next(chunks, None)
+                # Trailing off-level block so nothing stale replays before abort
+                if off is not None:
+                    write(off, wait_for_space(len(off)))
+            except Exception as e:
+                errors.append(e)
 
-            # Ensure chunk size is a multiple of 8 bytes (float64)
-            valid_bytes = len(chunk) - (len(chunk) % 8)
-            chunk = chunk[:valid_bytes]
+        session.initiate()
+        try:
+            writer = threading.Thread(target=producer, daemon=True)
+            writer.start()
+            writer.join()
+            if errors:
+                raise errors[0]
+            # Everything written has been generated once the buffer is empty again
+            wait_for_space(buffer_samples, record=True)
+        finally:
+            session.abort()
 
-            data = np.frombuffer(chunk, dtype='<f8').astype(np.float32)
+    if telemetry_path is not None:
+        telemetry.export(telemetry_path)
+    return telemetry
 
-            with nifgen.Session("Dev1") as session:
-                session.output_mode = nifgen.OutputMode.SCRIPT
-                session.arb_sample_rate = 25e6
+def stream_waveform_per_chunk(waveform):
+    if isinstance(waveform, (str, os.PathLike)):
+        waveform = read_waveform_chunks(waveform)
+    for data in waveform:
+        with nifgen.Session("Dev1") as session:
+            session.output_mode = nifgen.OutputMode.SCRIPT
+            session.arb_sample_rate = 25e6
 
-                waveform_name = "streamwave"
-                num_samples = len(data)
+            waveform_name = "streamwave"
+            num_samples = len(data)
 
-                # Allocate a named waveform
-                session.allocate_named_waveform(waveform_name, num_samples)
+            # Allocate a named waveform
+            session.allocate_named_waveform(waveform_name, num_samples)
 
-                # Write the waveform using the name (not handle)
-                session.write_waveform(waveform_name, data.tolist())
+            # Write the waveform using the name (not handle)
+            session.write_waveform(waveform_name, data.tolist())
 
-                # Write a script that references the named waveform
-                session.write_script(f"""
-                script main
-                    repeat 1
-                        generate {waveform_name}
-                    end repeat
-                end script
-                """)
+            # Write a script that references the named waveform
+            session.write_script(f"""
+            script main
+                repeat 1
+                    generate {waveform_name}
+                end repeat
+            end script
+            """)
 
-                # Start generation
-                with session.initiate():
-                    session.wait_until_done()
\ No newline at end of file
+            # Start generation
+            with session.initiate():
+                session.wait_until_done()
\ No newline at end of file
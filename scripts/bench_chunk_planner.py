@@ -0,0 +1,45 @@
+import sys
+import os
+import tempfile
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'nanostride')))
+from waveform_utils import allocation_size, plan_chunks
+
+# float64 sample counts: a round one, a typical job, and awkward sizes that
+# only factor into small divisors
+SAMPLE_COUNTS = [
+    64 * 1024 * 1024,
+    1000 * 512 * 512,
+    1000 * 512 * 512 + 1,
+    999_999_937,            # prime
+    2 * 499_999_993,        # 2 x prime
+]
+
+
+def main():
+    tmp_dir = tempfile.mkdtemp()
+    print(f"{'samples':>14} | {'allocation_size chunks':>22} {'time (s)':>9} | "
+          f"{'plan_chunks chunks':>18} {'pad':>5} {'time (s)':>9}")
+    for total_samples in SAMPLE_COUNTS:
+        # Sparse file of the right size, allocation_size only looks at its size
+        path = os.path.join(tmp_dir, "waveform.bin")
+        with open(path, "wb") as f:
+            f.truncate(total_samples * 8)
+
+        start = time.perf_counter()
+        chunk_bytes = allocation_size(path)
+        old_time = time.perf_counter() - start
+        old_chunks = total_samples * 8 // chunk_bytes
+
+        start = time.perf_counter()
+        plan = plan_chunks(total_samples, bytes_per_sample=8)
+        new_time = time.perf_counter() - start
+
+        print(f"{total_samples:>14} | {old_chunks:>22} {old_time:>9.4f} | "
+              f"{plan.num_chunks:>18} {plan.pad_samples:>5} {new_time:>9.6f}")
+        os.remove(path)
+    os.rmdir(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+import sys
+import os
+import argparse
+import json
+import platform
+import shutil
+import tempfile
+import time
+import queue
+import traceback
+import multiprocessing
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'nanostride')))
+import numpy as np
+from PIL import Image
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "benchmark_baseline.json")
+DEFAULT_TIMEOUT = 600  # s per benchmark run
+
+
+# Peak resident set size of this process, in bytes
+def peak_rss():
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        import psutil
+        return psutil.Process().memory_info().peak_wset
+
+
+# Deterministic synthetic slice stack: every pixel is white with probability
+# fill_density, drawn from a fixed seed
+def write_synthetic_stack(image_dir, layers, height, width, fill_density, seed=0):
+    os.makedirs(image_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    for i in range(layers):
+        layer = (rng.random((height, width)) < fill_density).astype(np.uint8) * 255
+        Image.fromarray(layer).save(os.path.join(image_dir, f"layer{i:05d}.png"))
+
+
+# Stand-in for the AWG: a fixed onboard buffer that chunks are copied into
+class FakeSink:
+    def __init__(self, buffer_samples):
+        self.buffer = np.empty(buffer_samples, dtype=np.int16)
+        self.position = 0
+        self.samples_written = 0
+
+    def write_waveform(self, handle, data):
+        n = len(data)
+        end = self.position + n
+        if end <= len(self.buffer):
+            self.buffer[self.position:end] = data
+        else:
+            split = len(self.buffer) - self.position
+            self.buffer[self.position:] = data[:split]
+            self.buffer[:n - split] = data[split:]
+        self.position = end % len(self.buffer)
+        self.samples_written += n
+
+
+# Each benchmark runs in a fresh process so its peak RSS is its own
+def bench_create_bidirectional_waveforms(work_dir):
+    from waveform_utils import create_bidirectional_waveforms
+    start = time.perf_counter()
+    waveform = create_bidirectional_waveforms(os.path.join(work_dir, "slices"))
+    elapsed = time.perf_counter() - start
+    return elapsed, waveform.size, waveform.nbytes
+
+def bench_save_binary_waveform(work_dir):
+    from waveform_utils import create_bidirectional_waveforms, save_binary_waveform
+    waveform = create_bidirectional_waveforms(os.path.join(work_dir, "slices"))
+    start = time.perf_counter()
+    save_binary_waveform(waveform, os.path.join(work_dir, "waveform"))
+    elapsed = time.perf_counter() - start
+    return elapsed, waveform.size, os.path.getsize(os.path.join(work_dir, "waveform.bin"))
+
+def bench_allocation_size(work_dir):
+    from waveform_utils import allocation_size
+    path = os.path.join(work_dir, "waveform.bin")
+    start = time.perf_counter()
+    allocation_size(path)
+    elapsed = time.perf_counter() - start
+    return elapsed, os.path.getsize(path) // 8, os.path.getsize(path)
+
+def bench_chunked_streaming(work_dir):
+    from waveform_utils import read_waveform_chunks
+    path = os.path.join(work_dir, "waveform.bin")
+    sink = FakeSink(40 * 1024 * 1024)
+    start = time.perf_counter()
+    for chunk in read_waveform_chunks(path, memory_budget=8 * 1024 * 1024, dtype=np.int16):
+        sink.write_waveform(None, chunk)
+    elapsed = time.perf_counter() - start
+    return elapsed, sink.samples_written, sink.samples_written * 2
+
+BENCHMARKS = {
+    "create_bidirectional_waveforms": bench_create_bidirectional_waveforms,
+    "save_binary_waveform": bench_save_binary_waveform,
+    "allocation_size": bench_allocation_size,
+    "chunked_streaming": bench_chunked_streaming,
+}
+
+# The child always reports: a result, or the traceback of what went wrong
+def _run_in_child(name, work_dir, results):
+    try:
+        elapsed, samples, nbytes = BENCHMARKS[name](work_dir)
+    except BaseException:
+        results.put({"error": traceback.format_exc()})
+        raise
+    results.put({
+        "seconds": elapsed,
+        "samples": int(samples),
+        "bytes": int(nbytes),
+        "samples_per_s": samples / elapsed if elapsed else None,
+        "mb_per_s": nbytes / elapsed / 1e6 if elapsed else None,
+        "peak_rss_mb": peak_rss() / 1e6,
+    })
+
+# Result of one child run, or {"error": ...} if it raised, died without
+# reporting or ran past timeout
+def _wait_for_result(child, results, timeout):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return results.get(timeout=0.5)
+        except queue.Empty:
+            pass
+        if not child.is_alive():
+            try:
+                return results.get(timeout=0.5)
+            except queue.Empty:
+                return {"error": f"exited with code {child.exitcode} without a result"}
+        if time.monotonic() > deadline:
+            child.terminate()
+            return {"error": f"timed out after {timeout} s"}
+
+def run_benchmark(name, work_dir, repeats, timeout=DEFAULT_TIMEOUT):
+    runs = []
+    for _ in range(repeats):
+        results = multiprocessing.Queue()
+        child = multiprocessing.Process(target=_run_in_child, args=(name, work_dir, results))
+        child.start()
+        result = _wait_for_result(child, results, timeout)
+        child.join()
+        if "error" in result:
+            return result
+        runs.append(result)
+    # Best time of the repeats, worst memory
+    best = min(runs, key=lambda r: r["seconds"])
+    best["peak_rss_mb"] = max(r["peak_rss_mb"] for r in runs)
+    return best
+
+
+# A benchmark regresses if it got slower or hungrier than baseline by more than tolerance
+def compare_to_baseline(results, baseline, tolerance):
+    failures = []
+    for name, result in results["benchmarks"].items():
+        if "error" in result or name not in baseline.get("benchmarks", {}):
+            continue
+        base = baseline["benchmarks"][name]
+        if result["seconds"] > base["seconds"] * (1 + tolerance):
+            failures.append(f"{name}: {result['seconds']:.4f} s vs baseline {base['seconds']:.4f} s")
+        if result["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+            failures.append(f"{name}: peak RSS {result['peak_rss_mb']:.1f} MB vs baseline {base['peak_rss_mb']:.1f} MB")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the slice-to-waveform pipeline.")
+    parser.add_argument("--layers", type=int, default=100)
+    parser.add_argument("--height", type=int, default=512)
+    parser.add_argument("--width", type=int, default=512)
+    parser.add_argument("--fill-density", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help="Seconds before a single benchmark run counts as failed")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="nanostride_bench_")
+    try:
+        write_synthetic_stack(os.path.join(work_dir, "slices"), args.layers, args.height,
+                              args.width, args.fill_density, args.seed)
+        # The file-based benchmarks need a waveform file on disk; build it in a
+        # child so this process stays small for the ones forked after it
+        setup = multiprocessing.Process(target=bench_save_binary_waveform, args=(work_dir,))
+        setup.start()
+        setup.join(args.timeout)
+        if setup.is_alive():
+            setup.terminate()
+            setup.join()
+            sys.exit(f"Setup (building the waveform file) timed out after {args.timeout} s.")
+        if setup.exitcode != 0:
+            sys.exit(f"Setup (building the waveform file) failed with exit code {setup.exitcode}.")
+
+        results = {
+            "config": {
+                "layers": args.layers, "height": args.height, "width": args.width,
+                "fill_density": args.fill_density, "seed": args.seed,
+            },
+            "repeats": args.repeats,
+            "machine": {"platform": platform.platform(), "python": platform.python_version(),
+                        "cpus": os.cpu_count()},
+            "benchmarks": {},
+        }
+        failed = []
+        for name in args.only:
+            result = run_benchmark(name, work_dir, args.repeats, args.timeout)
+            results["benchmarks"][name] = result
+            if "error" in result:
+                failed.append(name)
+                print(f"{name:<32} FAILED\n{result['error']}")
+                continue
+            print(f"{name:<32} {result['seconds']:>9.4f} s  {result['samples_per_s'] / 1e6:>9.1f} MS/s  "
+                  f"{result['mb_per_s']:>9.1f} MB/s  peak RSS {result['peak_rss_mb']:>8.1f} MB")
+    finally:
+        shutil.rmtree(work_dir)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if failed:
+        print(f"BENCHMARK FAILED: {', '.join(failed)}")
+        sys.exit(1)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline updated: {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --update-baseline to store one.")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("config") != results["config"]:
+        print("Baseline was recorded with a different configuration, not comparing.")
+        return
+    failures = compare_to_baseline(results, baseline, args.tolerance)
+    if failures:
+        print("PERFORMANCE REGRESSION:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print(f"No regressions against baseline (tolerance {args.tolerance:.0%}).")
+
+
+if __name__ == "__main__":
+    main()
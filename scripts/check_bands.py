@@ -0,0 +1,63 @@
+import sys
+import os
+import argparse
+import shutil
+import tempfile
+import numpy as np
+from PIL import Image
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'nanostride')))
+from slicer_utils import slice_and_extract, slice_and_extract_parallel
+
+STUB_SLICER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stub_slicer.py")
+
+
+# slice_sla runs the slicer path directly; on Windows a .py needs a wrapper
+def stub_slicer_command(work_dir):
+    if os.name != "nt":
+        return STUB_SLICER
+    wrapper = os.path.join(work_dir, "stub_slicer.cmd")
+    with open(wrapper, "w") as f:
+        f.write(f'@"{sys.executable}" "{STUB_SLICER}" %*\n')
+    return wrapper
+
+
+# Slice the part whole and in Z bands with the stub slicer (or a real one) and
+# check the stitched stack is the same layer for layer
+def main():
+    root = os.path.join(os.path.dirname(__file__), "..")
+    parser = argparse.ArgumentParser(description="Check parallel Z-band slicing against a whole-part slice.")
+    parser.add_argument("--stl", default=os.path.join(root, "test_files", "pyramid.stl"))
+    parser.add_argument("--config", default=os.path.join(root, "scripts", "config.ini"))
+    parser.add_argument("--slicer", default=None, help="Slicer executable, the offline stub by default")
+    parser.add_argument("--bands", type=int, default=4)
+    parser.add_argument("--layer-height", type=float, default=1.0)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="nanostride_bands_")
+    try:
+        slicer = args.slicer or stub_slicer_command(work_dir)
+        whole = slice_and_extract(slicer, args.stl, args.config, os.path.join(work_dir, "whole_out"),
+                                  os.path.join(work_dir, "whole"), layer_height=args.layer_height,
+                                  cache_dir=None)
+        banded = slice_and_extract_parallel(slicer, args.stl, args.config, os.path.join(work_dir, "bands_out"),
+                                            os.path.join(work_dir, "bands"), bands=args.bands,
+                                            layer_height=args.layer_height)
+
+        whole_files = sorted(f for f in os.listdir(whole) if f.endswith(".png"))
+        band_files = sorted(f for f in os.listdir(banded) if f.endswith(".png"))
+        if len(whole_files) != len(band_files):
+            sys.exit(f"FAIL: {len(whole_files)} layers sliced whole, {len(band_files)} in bands.")
+        mismatched = []
+        for i, (a, b) in enumerate(zip(whole_files, band_files)):
+            if not np.array_equal(np.asarray(Image.open(os.path.join(whole, a))),
+                                  np.asarray(Image.open(os.path.join(banded, b)))):
+                mismatched.append(i)
+        if mismatched:
+            sys.exit(f"FAIL: {len(mismatched)} of {len(whole_files)} layers differ, first at layer {mismatched[0]}.")
+        print(f"OK: {len(whole_files)} layers identical, whole vs {args.bands} bands.")
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
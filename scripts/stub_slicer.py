@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+import sys
+import os
+import io
+import math
+import argparse
+import configparser
+import zipfile
+import numpy as np
+from PIL import Image
+from stl import mesh
+
+# Offline stand-in for the PrusaSlicer CLI, enough of it for slice_sla:
+#   stub_slicer.py --load config.ini [--center X,Y] [--dont-arrange]
+#                  --export-sla part.stl --output DIR --layer-height H
+# writes DIR/part.sl1 with one PNG per layer, rasterized from the mesh cross
+# section at mid-layer (even-odd fill) on the display from the config, plus a
+# thumbnail and the config like a real archive. Layers only depend on the
+# geometry, so a part sliced whole and in Z bands gives identical images.
+
+def _read_display(config_path):
+    parser = configparser.ConfigParser()
+    with open(config_path) as f:
+        parser.read_string("[config]\n" + f.read())
+    config = parser["config"]
+    return (int(config.get("display_pixels_x", 300)), int(config.get("display_pixels_y", 300)),
+            float(config.get("display_width", 1000)), float(config.get("display_height", 1000)))
+
+# Cross-section segments of the triangles at height z, as (n, 2, 2) XY pairs
+def _section(vectors, z):
+    above = vectors[:, :, 2] > z
+    crossing = vectors[(above.sum(axis=1) == 1) | (above.sum(axis=1) == 2)]
+    above = crossing[:, :, 2] > z
+    segments = []
+    for a, b in ((0, 1), (1, 2), (2, 0)):
+        cut = above[:, a] != above[:, b]
+        pa, pb = crossing[:, a], crossing[:, b]
+        t = (z - pa[:, 2]) / np.where(cut, pb[:, 2] - pa[:, 2], 1)
+        segments.append(np.where(cut[:, None], pa[:, :2] + t[:, None] * (pb[:, :2] - pa[:, :2]), np.nan))
+    points = np.stack(segments, axis=1)
+    # Every cut triangle has exactly two crossed edges
+    return np.array([p[~np.isnan(p[:, 0])] for p in points]).reshape(-1, 2, 2)
+
+# Even-odd scanline fill at pixel centres; half-open edges (y0 <= y < y1) so
+# segments split at a shared vertex are not counted twice
+def _rasterize(segments, pixels_x, pixels_y, width, height):
+    image = np.zeros((pixels_y, pixels_x), dtype=np.uint8)
+    if len(segments) == 0:
+        return image
+    x_centres = (np.arange(pixels_x) + 0.5) * width / pixels_x
+    (x0, y0), (x1, y1) = segments[:, 0].T, segments[:, 1].T
+    low, high = np.minimum(y0, y1), np.maximum(y0, y1)
+    for row in range(pixels_y):
+        y = (row + 0.5) * height / pixels_y
+        hit = (low <= y) & (y < high)
+        if not hit.any():
+            continue
+        xs = np.sort(x0[hit] + (y - y0[hit]) * (x1[hit] - x0[hit]) / (y1[hit] - y0[hit]))
+        inside = np.searchsorted(xs, x_centres) % 2 == 1
+        # Image rows run top to bottom, display Y bottom to top
+        image[pixels_y - 1 - row] = inside * 255
+    return image
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline PrusaSlicer stand-in for SLA slicing.")
+    parser.add_argument("--load", required=True)
+    parser.add_argument("--center")
+    parser.add_argument("--dont-arrange", action="store_true")
+    parser.add_argument("--export-sla", required=True)
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--layer-height", type=float, default=1.0)
+    args = parser.parse_args()
+
+    pixels_x, pixels_y, width, height = _read_display(args.load)
+    vectors = mesh.Mesh.from_file(args.export_sla).vectors.astype(float)
+    lo, hi = vectors.reshape(-1, 3).min(axis=0), vectors.reshape(-1, 3).max(axis=0)
+    if args.center is not None:
+        cx, cy = (float(v) for v in args.center.split(","))
+        vectors[:, :, 0] += cx - (lo[0] + hi[0]) / 2
+        vectors[:, :, 1] += cy - (lo[1] + hi[1]) / 2
+    # Same layer count rule as slice_and_extract_parallel
+    layers = math.ceil((hi[2] - lo[2]) / args.layer_height - 1e-4)
+
+    basename = os.path.splitext(os.path.basename(args.export_sla))[0]
+    os.makedirs(args.output, exist_ok=True)
+    with zipfile.ZipFile(os.path.join(args.output, f"{basename}.sl1"), "w") as archive:
+        archive.write(args.load, "config.ini")
+        for k in range(layers):
+            z = lo[2] + (k + 0.5) * args.layer_height
+            image = _rasterize(_section(vectors, z), pixels_x, pixels_y, width, height)
+            png = io.BytesIO()
+            Image.fromarray(image).save(png, "PNG")
+            archive.writestr(f"{basename}{k:05d}.png", png.getvalue())
+        thumbnail = io.BytesIO()
+        Image.new("RGB", (400, 400)).save(thumbnail, "PNG")
+        archive.writestr("thumbnail/thumbnail400x400.png", thumbnail.getvalue())
+    print(f"Slicing result exported to {os.path.join(args.output, basename + '.sl1')}")
+
+if __name__ == "__main__":
+    sys.exit(main())